@@ -2,7 +2,10 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # Default to local SQLite file in backend/data/app.db
-    DATABASE_URL: str = "sqlite:///./data/app.db"
+    DATABASE_URL: str = "sqlite+aiosqlite:///./data/app.db"
     ALLOW_ORIGINS: list[str] = ["*"]
+    # bcrypt work factor (log2 of key-expansion iterations). Each +1 doubles
+    # login latency and halves an offline attacker's guessing throughput.
+    BCRYPT_ROUNDS: int = 10
 
 settings = Settings()
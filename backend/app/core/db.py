@@ -1,18 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from ..core.config import settings
 
-# SQLAlchemy engine and session factory
-engine = create_engine(
+_IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+_CONNECT_ARGS = {"check_same_thread": False} if _IS_SQLITE else {}
+
+# Async SQLAlchemy engine and session factory
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    connect_args=_CONNECT_ARGS,
+)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+# Single-connection pool for /health, so a saturated app pool cannot fail the probe;
+# pool_timeout caps how long a probe waits behind a concurrent one
+health_engine = create_async_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
+    connect_args=_CONNECT_ARGS,
+    # aiosqlite file databases default to NullPool, which would reconnect on every probe
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=2,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# WAL lets readers run alongside the writer; synchronous=NORMAL skips the per-commit fsync
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB
+)
+
+if _IS_SQLITE:
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
 
 # Dependency for FastAPI routes
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
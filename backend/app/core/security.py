@@ -1,33 +1,118 @@
+import base64
+import hashlib
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import bcrypt
+import orjson
 
-PASSWORD_CONTEXT = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+from .config import settings
+
+# Hashes written by the previous passlib CryptContext default scheme
+LEGACY_PBKDF2_PREFIX = "$pbkdf2-sha256$"
+# bcrypt only consumes the first 72 bytes of its input
+BCRYPT_MAX_BYTES = 72
+# Prepended to "$2b$..." when bcrypt was fed the SHA-256 hex digest of the password
+BCRYPT_SHA256_MARKER = "$bcrypt-sha256"
 
 # In production, set via env variable
 JWT_SECRET = "change-me-in-env"
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_MINUTES = 60 * 12  # 12 hours
+# Encoded once so signing/verifying skips per-call key preparation
+_JWT_KEY = JWT_SECRET.encode("utf-8")
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+# Only HS256 tokens are issued, so the header segment is a constant
+_HEADER_B64 = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64url_encode(hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest())
+
+
+def _bcrypt_input(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def _prehash(password: str) -> bytes:
+    # 64 hex chars: every byte of the password counts and no NUL reaches bcrypt
+    return hashlib.sha256(password.encode("utf-8")).hexdigest().encode("ascii")
+
+
+def _ab64_decode(data: str) -> bytes:
+    # passlib's "adapted base64": '.' instead of '+', no padding
+    data = data.replace(".", "+")
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _verify_legacy_pbkdf2(password: str, password_hash: str) -> bool:
+    try:
+        rounds, salt, checksum = password_hash[len(LEGACY_PBKDF2_PREFIX):].split("$")
+        expected = _ab64_decode(checksum)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _ab64_decode(salt), int(rounds))
+    except ValueError as e:
+        raise ValueError("Malformed pbkdf2-sha256 hash") from e
+    return hmac.compare_digest(digest, expected)
 
 
 def hash_password(password: str) -> str:
-    return PASSWORD_CONTEXT.hash(password)
+    hashed = bcrypt.hashpw(_prehash(password), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS))
+    return BCRYPT_SHA256_MARKER + hashed.decode("ascii")
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return PASSWORD_CONTEXT.verify(password, password_hash)
+    if password_hash.startswith(LEGACY_PBKDF2_PREFIX):
+        return _verify_legacy_pbkdf2(password, password_hash)
+    if password_hash.startswith(BCRYPT_SHA256_MARKER):
+        return bcrypt.checkpw(_prehash(password), password_hash[len(BCRYPT_SHA256_MARKER):].encode("ascii"))
+    # Plain bcrypt over the raw password, written before pre-hashing was introduced
+    return bcrypt.checkpw(_bcrypt_input(password), password_hash.encode("ascii"))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """Return True for hashes that should be upgraded to the current bcrypt scheme and cost."""
+    if password_hash.startswith(LEGACY_PBKDF2_PREFIX):
+        return True
+    if not password_hash.startswith(BCRYPT_SHA256_MARKER):
+        # Plain bcrypt from before pre-hashing; unrecognized formats are left alone
+        return password_hash.startswith("$2")
+    try:
+        # "$bcrypt-sha256$2b$<cost>$..."
+        return int(password_hash.split("$")[3]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 
 def create_access_token(subject: str, expires_minutes: int | None = None) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or JWT_EXPIRE_MINUTES)
-    to_encode = {"sub": subject, "exp": expire}
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    payload_b64 = _b64url_encode(orjson.dumps({"sub": subject, "exp": int(expire.timestamp())}))
+    signing_input = _HEADER_B64 + b"." + payload_b64
+    return (signing_input + b"." + _sign(signing_input)).decode("ascii")
 
 
 def decode_token(token: str) -> Optional[dict]:
+    """Verify an HS256 token issued by create_access_token; None if invalid or expired."""
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-    except JWTError:
+        signing_input, _, signature = token.encode("ascii").rpartition(b".")
+        header_b64, _, payload_b64 = signing_input.partition(b".")
+        if header_b64 != _HEADER_B64 or not hmac.compare_digest(_sign(signing_input), signature):
+            return None
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, int) or exp <= datetime.now(timezone.utc).timestamp()):
         return None
+    return payload
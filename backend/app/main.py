@@ -1,12 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .routers import health, sample, auth
 from .routers import files as files_router
 from .routers import rag as rag_router
-from .core.db import engine
-from .models import Base
+from .core.db import engine, health_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tables are created by scripts/init_db.py before the workers start
+    yield
+    await engine.dispose()
+    await health_engine.dispose()
 
-app = FastAPI(title="Hackathon-09-26 API")
+
+app = FastAPI(title="Hackathon-09-26 API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,11 +27,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-def on_startup():
-    # Create tables if not exist
-    Base.metadata.create_all(bind=engine)
-
 app.include_router(health.router, prefix="/api")
 app.include_router(sample.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
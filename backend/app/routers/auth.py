@@ -1,21 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
+import asyncio
 import logging
 
 from ..core.db import get_db
-from ..core.security import create_access_token, hash_password, verify_password
+from ..core.security import create_access_token, hash_password, needs_rehash, verify_password
 from ..models import User
 from ..schemas import Token, UserCreate, UserOut
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Built once so every lookup reuses the same cached compiled statement
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
 logger = logging.getLogger(__name__)
 
+# Verified against when the email is unknown so both failure paths pay for one bcrypt check
+_DUMMY_HASH = hash_password("x" * 16)
+
 
 @router.post("/register", response_model=UserOut)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user account with the provided credentials.
     
@@ -29,26 +37,30 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         HTTPException: Raised with status 400 if the email is already registered or if registration fails for any other reason.
     """
     try:
-        existing = db.query(User).filter(User.email == user_in.email).first()
+        existing = (await db.execute(_USER_BY_EMAIL, {"email": user_in.email})).scalar_one_or_none()
         if existing:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-        user = User(email=user_in.email, password_hash=hash_password(user_in.password))
+        # bcrypt is CPU-bound; run it off the event loop
+        password_hash = await asyncio.to_thread(hash_password, user_in.password)
+        user = User(email=user_in.email, password_hash=password_hash)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         # Defensive: unique constraint race
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    except HTTPException:
+        raise
     except Exception as e:  # noqa: BLE001
-        db.rollback()
+        await db.rollback()
         logger.exception("Unhandled error during registration")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Registration failed")
 
 
 @router.post("/login", response_model=Token)
-def login(user_in: UserCreate, db: Session = Depends(get_db)):
+async def login(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user credentials and return an access token.
     
@@ -62,9 +74,16 @@ def login(user_in: UserCreate, db: Session = Depends(get_db)):
         HTTPException: With status 400 if credentials are incorrect or if authentication fails for any other reason.
     """
     try:
-        user = db.query(User).filter(User.email == user_in.email).first()
-        if not user or not verify_password(user_in.password, user.password_hash):
+        user = (await db.execute(_USER_BY_EMAIL, {"email": user_in.email})).scalar_one_or_none()
+        if user is None:
+            await asyncio.to_thread(verify_password, user_in.password, _DUMMY_HASH)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect email or password")
+        if not await asyncio.to_thread(verify_password, user_in.password, user.password_hash):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect email or password")
+        if needs_rehash(user.password_hash):
+            # Upgrade legacy or re-tuned hashes while the plaintext is available
+            user.password_hash = await asyncio.to_thread(hash_password, user_in.password)
+            await db.commit()
         token = create_access_token(subject=user.email)
         return Token(access_token=token)
     except HTTPException:
@@ -1,44 +1,77 @@
+import asyncio
+import functools
+import os
+import shutil
 from pathlib import Path
 from typing import List
 
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..deps import get_current_user
 from ..models import Document, User
 from ..core.db import get_db
-from ..services.rag_service import ensure_user_dir
+from ..services.rag_service import ensure_user_dir, user_dir
 
 router = APIRouter(prefix="/files", tags=["files"])
 
+# Uploads are streamed to disk in bounded chunks instead of read whole into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Built once so every request reuses the same cached compiled statements
+# Column tuples rather than ORM entities: the listing only serializes these fields
+_DOCS_BY_USER = (
+    select(Document.id, Document.filename, Document.created_at)
+    .where(Document.user_id == bindparam("uid"))
+    .order_by(Document.created_at.desc(), Document.id.desc())
+)
+_DOC_BY_ID_FOR_USER = select(Document).where(
+    Document.id == bindparam("doc_id"), Document.user_id == bindparam("uid")
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolved_user_dir(user_id: int) -> str:
+    """Resolved user directory, cached so downloads skip the resolve syscalls."""
+    return os.path.realpath(user_dir(user_id))
+
+
+def _write_upload(uf: UploadFile, dest: Path) -> None:
+    with dest.open("wb") as f:
+        shutil.copyfileobj(uf.file, f, length=UPLOAD_CHUNK_SIZE)
+
 
 @router.post("/upload")
-def upload_files(
+async def upload_files(
     files: List[UploadFile] = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    saved = []
-    user_dir = ensure_user_dir(current_user.id)
+    udir = ensure_user_dir(current_user.id)
     for uf in files:
         # Basic validation
         if not uf.filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
-        dest: Path = user_dir / uf.filename
-        with dest.open("wb") as f:
-            f.write(uf.file.read())
-        doc = Document(user_id=current_user.id, filename=uf.filename, path=str(dest))
-        db.add(doc)
-        saved.append(uf.filename)
-    db.commit()
+    # Files are independent, so write them concurrently in worker threads. A
+    # repeated filename keeps only its last upload, as sequential writes did.
+    latest = {uf.filename: uf for uf in files}
+    await asyncio.gather(
+        *(asyncio.to_thread(_write_upload, uf, udir / name) for name, uf in latest.items())
+    )
+    # Core executemany insert: compiled once, no per-row ORM identity-map work
+    rows = [{"user_id": current_user.id, "filename": uf.filename, "path": str(udir / uf.filename)} for uf in files]
+    await db.execute(insert(Document), rows)
+    await db.commit()
+    saved = [uf.filename for uf in files]
     return {"saved": saved}
 
 
 @router.get("/")
-def list_files(
+async def list_files(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     List documents belonging to the authenticated user.
@@ -47,25 +80,20 @@ def list_files(
         A list of dictionaries, each containing metadata for a document:
         - `id` (int): Document primary key.
         - `filename` (str): Original filename as uploaded.
-        - `path` (str): Filesystem path where the document is stored.
-        - `created_at` (str): Creation timestamp in ISO 8601 format.
+        - `created_at` (datetime): Creation timestamp, serialized as ISO 8601 by the response class.
     """
-    docs = db.query(Document).filter(Document.user_id == current_user.id).order_by(Document.created_at.desc()).all()
+    rows = (await db.execute(_DOCS_BY_USER, {"uid": current_user.id})).all()
     return [
-        {
-            "id": d.id,
-            "filename": d.filename,
-            "created_at": d.created_at.isoformat(),
-        }
-        for d in docs
+        {"id": doc_id, "filename": filename, "created_at": created_at}
+        for doc_id, filename, created_at in rows
     ]
 
 
 @router.get("/download/{doc_id}")
-def download_file(
+async def download_file(
     doc_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Send a user-owned document file as an HTTP file response.
@@ -82,16 +110,14 @@ def download_file(
         HTTPException: 404 if the document is not found or the file is missing on disk.
         HTTPException: 403 if the document's stored path is outside the user's directory.
     """
-    doc = db.query(Document).filter(Document.id == doc_id, Document.user_id == current_user.id).first()
+    doc = (await db.execute(_DOC_BY_ID_FOR_USER, {"doc_id": doc_id, "uid": current_user.id})).scalar_one_or_none()
     if not doc:
         raise HTTPException(status_code=404, detail="File not found")
-    path = Path(doc.path)
     # Ensure the file resides under the user's directory for safety
-    user_dir = ensure_user_dir(current_user.id)
-    try:
-        path.resolve().relative_to(user_dir.resolve())
-    except Exception:  # noqa: BLE001
+    user_root = _resolved_user_dir(current_user.id)
+    real = os.path.realpath(doc.path)
+    if not (real == user_root or real.startswith(user_root + os.sep)):
         raise HTTPException(status_code=403, detail="Access denied")
-    if not path.exists():
+    if not os.path.isfile(real):
         raise HTTPException(status_code=404, detail="File missing on disk")
-    return FileResponse(path, filename=doc.filename)
+    return FileResponse(real, filename=doc.filename)
@@ -1,73 +1,201 @@
-from fastapi import APIRouter
+import asyncio
+import os
+import socket
+import sys
+import time
+from typing import NamedTuple
+
+import orjson
+from fastapi import APIRouter, Header, Response
 from sqlalchemy import text
-from ..core.db import engine
+from ..core.db import health_engine
 
 router = APIRouter()
 
+# Probes hit SQLite and google.com, so back-to-back liveness checks reuse a recent report
+HEALTH_CACHE_TTL_SECONDS = 5.0
+# (expiry, report, report serialized to JSON) — hits return the bytes as they are
+_cached_report: tuple[float, dict, bytes] | None = None
+# Requests arriving while the checks run wait for that report instead of probing again
+_refresh_lock = asyncio.Lock()
+# Upper bound on a refresh; a check still running by then is cancelled and reported failed
+HEALTH_PROBE_TIMEOUT_SECONDS = 1.0
 
-@router.get("/health")
-def health():
-    """
-    Run health checks for database connectivity, internet reachability, and memory availability.
-    
-    Performs three checks and aggregates results into a dictionary describing overall service health and individual check details.
-    
-    Returns:
-        result (dict): Health report with keys:
-            - "status" (str): "ok" if all checks pass, "degraded" if any check fails.
-            - "checks" (dict): Mapping of check name to its result object:
-                - "database": {"ok": bool, "detail": str or None} — connection status or error message.
-                - "internet": {"ok": bool, "detail": str or None} — HTTP status detail or error message.
-                - "memory": {"ok": bool, "detail": dict or None} — memory metrics or error message.
-                  When present, memory detail contains "total_mb", "available_mb", and "percent". Memory is considered ok only when available memory is greater than 100 MB.
-    """
-    result = {
-        "status": "ok",
-        "checks": {
-            "database": {"ok": False, "detail": None},
-            "internet": {"ok": False, "detail": None},
-            "memory": {"ok": False, "detail": None},
-        },
-    }
+# A TCP handshake is enough to show outbound connectivity, without TLS and HTTP round trips
+INTERNET_PROBE_ADDRESS = ("www.google.com", 443)
+# Bounds DNS resolution plus the connect, so a slow network marks the check failed quickly
+INTERNET_PROBE_TIMEOUT_SECONDS = 0.5
+# Resolved addresses are reused for this long, so most probes skip the DNS lookup
+INTERNET_PROBE_DNS_TTL_SECONDS = 300.0
+# (expiry, [(ip, port), ...]); the first address is tried, and a failing one moves to the back
+_probe_addrs: tuple[float, list] | None = None
+
+# Built once instead of constructing a TextClause on every probe
+_PING_SQL = text("SELECT 1")
+
+_MB = 1024 * 1024
+# Memory is considered ok only above this much available
+_MIN_AVAILABLE_BYTES = 100 * _MB
 
-    # Database connectivity
+# On Linux one read of /proc/meminfo replaces psutil's several reads and object setup
+_HAVE_PROC_MEMINFO = sys.platform.startswith("linux")
+
+# Resolved once at import; None on Linux, or when psutil is not installed
+_psutil = None
+if not _HAVE_PROC_MEMINFO:
+    try:
+        import psutil as _psutil
+    except ImportError:
+        pass
+
+
+class _MemInfo(NamedTuple):
+    total: int
+    available: int
+    percent: float
+
+
+async def _check_database() -> dict:
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        result["checks"]["database"] = {"ok": True, "detail": "connected"}
+        async with health_engine.connect() as conn:
+            await conn.execute(_PING_SQL)
+        return {"ok": True, "detail": "connected"}
     except Exception as e:  # noqa: BLE001
-        result["status"] = "degraded"
-        result["checks"]["database"] = {"ok": False, "detail": str(e)}
+        return {"ok": False, "detail": str(e)}
 
-    # Internet reachability
+
+def _tcp_connect() -> None:
+    global _probe_addrs
+    now = time.monotonic()
+    if _probe_addrs is None or _probe_addrs[0] <= now:
+        host, port = INTERNET_PROBE_ADDRESS
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        _probe_addrs = (now + INTERNET_PROBE_DNS_TTL_SECONDS, [info[4][:2] for info in infos])
+    addrs = _probe_addrs[1]
     try:
-        import requests  # lazy import
+        with socket.create_connection(addrs[0], timeout=INTERNET_PROBE_TIMEOUT_SECONDS):
+            pass
+    except OSError:
+        addrs.append(addrs.pop(0))
+        raise
 
-        r = requests.get("https://www.google.com/generate_204", timeout=3)
-        ok = r.status_code in (204, 200)
-        result["checks"]["internet"] = {"ok": ok, "detail": f"status={r.status_code}"}
-        if not ok:
-            result["status"] = "degraded"
-    except Exception as e:  # noqa: BLE001
-        result["status"] = "degraded"
-        result["checks"]["internet"] = {"ok": False, "detail": str(e)}
 
-    # Memory availability
+async def _check_internet() -> dict:
     try:
-        import psutil  # lazy import
+        # Blocking connect runs in a worker thread to keep the event loop free
+        await asyncio.wait_for(asyncio.to_thread(_tcp_connect), INTERNET_PROBE_TIMEOUT_SECONDS)
+        return {"ok": True, "detail": "tcp_ok"}
+    except TimeoutError:
+        return {"ok": False, "detail": "timed out"}
+    except Exception as e:  # noqa: BLE001
+        return {"ok": False, "detail": str(e)}
+
+
+def _meminfo_field(data: bytes, key: bytes) -> int:
+    start = data.index(key) + len(key)
+    return int(data[start:data.index(b"kB", start)]) * 1024
+
+
+def _parse_meminfo(data: bytes) -> _MemInfo:
+    total = _meminfo_field(data, b"MemTotal:")
+    available = _meminfo_field(data, b"MemAvailable:")
+    # Same figure psutil reports: used share of total, one decimal
+    percent = round((total - available) / total * 100, 1) if total else 0.0
+    return _MemInfo(total, available, percent)
+
+
+def _virtual_memory():
+    """Return an object with total/available bytes and percent used, like psutil.virtual_memory()."""
+    if _HAVE_PROC_MEMINFO:
+        fd = os.open("/proc/meminfo", os.O_RDONLY)
+        try:
+            return _parse_meminfo(os.read(fd, 8192))
+        finally:
+            os.close(fd)
 
-        vm = psutil.virtual_memory()
+    if _psutil is None:
+        raise ModuleNotFoundError("No module named 'psutil'")
+    return _psutil.virtual_memory()
+
+
+async def _check_memory() -> dict:
+    try:
+        vm = _virtual_memory()
         detail = {
-            "total_mb": round(vm.total / (1024 * 1024), 1),
-            "available_mb": round(vm.available / (1024 * 1024), 1),
+            "total_mb": round(vm.total / _MB, 1),
+            "available_mb": round(vm.available / _MB, 1),
             "percent": vm.percent,
         }
-        ok = vm.available > 100 * 1024 * 1024  # >100MB free
-        result["checks"]["memory"] = {"ok": ok, "detail": detail}
-        if not ok:
-            result["status"] = "degraded"
+        return {"ok": vm.available > _MIN_AVAILABLE_BYTES, "detail": detail}
     except Exception as e:  # noqa: BLE001
-        result["status"] = "degraded"
-        result["checks"]["memory"] = {"ok": False, "detail": str(e)}
+        return {"ok": False, "detail": str(e)}
+
+
+_CHECKS = (("database", _check_database), ("internet", _check_internet), ("memory", _check_memory))
+
+
+async def _run_checks() -> dict:
+    tasks = {name: asyncio.create_task(check()) for name, check in _CHECKS}
+    done, pending = await asyncio.wait(tasks.values(), timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+    return {
+        name: task.result() if task in done else {"ok": False, "detail": "probe timeout"}
+        for name, task in tasks.items()
+    }
+
+
+async def _current_report() -> tuple[float, dict, bytes]:
+    """Return the cached (expiry, report, body), running the checks first if it has gone stale."""
+    global _cached_report
+    report = _cached_report
+    if report is not None and report[0] > time.monotonic():
+        return report
+
+    async with _refresh_lock:
+        now = time.monotonic()
+        if _cached_report is not None and _cached_report[0] > now:
+            return _cached_report
+
+        checks = await _run_checks()
+        result = {
+            "status": "ok" if all(c["ok"] for c in checks.values()) else "degraded",
+            "checks": checks,
+        }
+        _cached_report = (now + HEALTH_CACHE_TTL_SECONDS, result, orjson.dumps(result))
+        return _cached_report
+
+
+def _etag(report: tuple[float, dict, bytes]) -> str:
+    # Each refresh gets a new expiry, so it identifies the report body
+    return f'"{report[0]}"'
+
+
+@router.get("/health")
+async def health(if_none_match: str | None = Header(default=None)):
+    """
+    Run health checks for database connectivity, internet reachability, and memory availability.
+    
+    Runs the three checks concurrently, giving up on any still running after HEALTH_PROBE_TIMEOUT_SECONDS, and aggregates results into a dictionary describing overall service health and individual check details. A report is reused for HEALTH_CACHE_TTL_SECONDS before the checks run again, and concurrent requests share a single refresh. The ETag header identifies the report; a matching If-None-Match gets an empty 304.
+    
+    Returns:
+        Response: JSON body holding the health report, serialized once per refresh, with keys:
+            - "status" (str): "ok" if all checks pass, "degraded" if any check fails.
+            - "checks" (dict): Mapping of check name to its result object:
+                - "database": {"ok": bool, "detail": str or None} — connection status or error message.
+                - "internet": {"ok": bool, "detail": str or None} — "tcp_ok" or error message.
+                - "memory": {"ok": bool, "detail": dict or None} — memory metrics or error message.
+                  When present, memory detail contains "total_mb", "available_mb", and "percent". Memory is considered ok only when available memory is greater than 100 MB.
+    """
+    report = await _current_report()
+    etag = _etag(report)
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=report[2], media_type="application/json", headers={"ETag": etag})
+
 
-    return result
+@router.head("/health")
+async def health_head():
+    """Answer load balancer HEAD polls with a status code only: 200 when the report is "ok", else 503."""
+    report = await _current_report()
+    return Response(status_code=200 if report[1]["status"] == "ok" else 503, headers={"ETag": _etag(report)})
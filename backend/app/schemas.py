@@ -1,20 +1,40 @@
+import re
 from datetime import datetime
-from pydantic import BaseModel, EmailStr
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, StringConstraints
+
+# Compiled once at import; a structural check instead of email-validator's per-call parsing
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _lower_domain(email: str) -> str:
+    # EmailStr lowercased the domain; keep stored emails matching on login
+    local, _, domain = email.rpartition("@")
+    return f"{local}@{domain.lower()}"
+
+
+Email = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, max_length=254, pattern=EMAIL_RE),
+    AfterValidator(_lower_domain),
+]
 
 
 class UserCreate(BaseModel):
-    email: EmailStr
+    model_config = ConfigDict(extra="ignore")
+
+    email: Email
     password: str
 
 
 class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
-    email: EmailStr
+    email: Email
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 class Token(BaseModel):
     access_token: str
@@ -22,13 +42,12 @@ class Token(BaseModel):
 
 
 class DocumentOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     filename: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 class AssessRequest(BaseModel):
     text: str
@@ -8,14 +8,21 @@ from typing import List
 USERS_DATA = Path("backend/data/users")
 
 
+def user_dir(user_id: int) -> Path:
+    # Pure path composition; read-only callers skip the mkdir syscalls
+    return USERS_DATA / str(user_id)
+
+
 def ensure_user_dir(user_id: int) -> Path:
-    udir = USERS_DATA / str(user_id)
+    udir = user_dir(user_id)
     udir.mkdir(parents=True, exist_ok=True)
     return udir
 
 
 def list_user_files(user_id: int) -> List[Path]:
-    udir = ensure_user_dir(user_id)
+    udir = user_dir(user_id)
+    if not udir.is_dir():
+        return []
     return [p for p in udir.iterdir() if p.is_file()]
 
 
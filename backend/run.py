@@ -1,4 +1,24 @@
+import asyncio
+import os
+import sys
+
 import uvicorn
 
+from scripts.init_db import init_db
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
+    # One-shot DDL here rather than in every worker's startup
+    asyncio.run(init_db())
+    # WEB_CONCURRENCY > 1 runs multiple worker processes (auto-reload is dev-only)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    uvicorn.run(
+        "app.main:app",
+        host="127.0.0.1",
+        port=8000,
+        reload=workers == 1,
+        workers=workers,
+        # C-based event loop and HTTP parser from uvicorn[standard]; uvloop has no Windows build
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", "5")),
+    )
@@ -0,0 +1,21 @@
+"""Create database tables once, before the API workers start."""
+import asyncio
+import os
+import sys
+
+# Allow `python scripts/init_db.py` from backend/ to import the `app` package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.db import engine  # noqa: E402
+from app.models import Base  # noqa: E402
+
+
+async def init_db() -> None:
+    # Create tables if not exist
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(init_db())
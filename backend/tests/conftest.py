@@ -6,4 +6,17 @@ Adds backend/ to sys.path so tests can import app.core.security.
 import os
 import sys
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
\ No newline at end of file
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _fast_kdf():
+    """Hash with bcrypt's minimum cost; tests only check hash shape and round-trips."""
+    from app.core.config import settings
+
+    mp = pytest.MonkeyPatch()
+    mp.setattr(settings, "BCRYPT_ROUNDS", 4)
+    yield
+    mp.undo()
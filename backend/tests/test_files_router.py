@@ -1,109 +1,277 @@
+import asyncio
+import os
 import tempfile
 import pytest
+from datetime import datetime
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-from fastapi.testclient import TestClient
-from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from types import SimpleNamespace
+from unittest.mock import Mock
+from urllib.parse import quote
 import io
 
-from backend.api.routers.files import router
-from backend.models import Document, User
-from fastapi import FastAPI
+# FastAPI, SQLAlchemy and the app package are imported inside fixtures, so an
+# xdist worker that never runs this module does not pay for them at collection
 
-# Create a test FastAPI app with just the files router
-app = FastAPI()
-app.include_router(router)
-client = TestClient(app)
+# Small chunks let a small payload still cross several streaming boundaries;
+# set LARGE_UPLOAD_BYTES=1048576 locally for the old 1 MB stress upload
+_TEST_CHUNK_SIZE = 16 * 1024
+LARGE_UPLOAD_BYTES = int(os.environ.get("LARGE_UPLOAD_BYTES", 64 * 1024))
+
+@pytest.fixture(scope="session")
+def app():
+    """A FastAPI app with just the files router"""
+    from fastapi import FastAPI
+    from fastapi.responses import ORJSONResponse
+    from app.routers.files import router
+
+    test_app = FastAPI(default_response_class=ORJSONResponse)
+    test_app.include_router(router)
+    return test_app
+
+@pytest.fixture(scope="session")
+def files_module(app):
+    """The router module, for swapping its helpers and settings"""
+    from app.routers import files
+
+    return files
+
+@pytest.fixture(scope="module")
+def client(app):
+    """One TestClient per module, entered once so its portal and transport are reused"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture(scope="module")
+def _shared_user():
+    """One user mock for the whole module, served through dependency_overrides"""
+    from app.models import User
 
-@pytest.fixture
-def mock_user():
-    """Create a mock user for testing"""
     user = Mock(spec=User)
     user.id = 123
     user.username = "testuser"
     return user
 
+@pytest.fixture(scope="module")
+def _shared_db():
+    """One session mock for the whole module, served through dependency_overrides"""
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    return Mock(spec=AsyncSession)
+
+@pytest.fixture(scope="module", autouse=True)
+def _override_deps(app, _shared_user, _shared_db):
+    """Install the auth/session overrides once instead of patching them per test"""
+    from app.core.db import get_db
+    from app.deps import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: _shared_user
+    app.dependency_overrides[get_db] = lambda: _shared_db
+    yield
+    app.dependency_overrides.clear()
+
 @pytest.fixture
-def mock_db():
-    """Create a mock database session"""
-    return Mock(spec=Session)
+def mock_user(_shared_user):
+    """The authenticated user every request resolves to"""
+    return _shared_user
+
+@pytest.fixture(autouse=True)
+def mock_db(_shared_db):
+    """The shared session mock, with calls and per-test wiring cleared"""
+    from sqlalchemy.engine import Result
+
+    _shared_db.reset_mock(side_effect=True)
+    _shared_db.execute.return_value = Mock(spec=Result)
+    return _shared_db
 
 @pytest.fixture
 def mock_document():
-    """Create a mock document"""
-    doc = Mock(spec=Document)
-    doc.id = 1
-    doc.filename = "test.txt"
-    doc.path = str(Path(tempfile.gettempdir()) / "user_123" / "test.txt")
-    doc.user_id = 123
-    doc.created_at = "2023-01-01T00:00:00"
-    return doc
+    """Read-only Document stand-in; the router only reads its attributes"""
+    return SimpleNamespace(
+        id=1,
+        filename="test.txt",
+        path=str(Path(tempfile.gettempdir()) / "user_123" / "test.txt"),
+        user_id=123,
+        created_at=datetime(2023, 1, 1),
+    )
 
 @pytest.fixture
-def temp_user_dir():
-    """Create a temporary directory for testing file operations"""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        user_dir = Path(temp_dir) / "user_123"
-        user_dir.mkdir()
-        yield user_dir
+def temp_user_dir(fs):
+    """Create the user directory on pyfakefs' in-memory filesystem"""
+    user_dir = Path("/tmp/user_123")
+    fs.create_dir(user_dir)
+    return user_dir
+
+@pytest.fixture
+def patched_user_dir(files_module, temp_user_dir, monkeypatch):
+    """Point the router's user directory helpers at temp_user_dir (upload/download tests only)"""
+    files_module._resolved_user_dir.cache_clear()
+    monkeypatch.setattr(files_module, "ensure_user_dir", lambda user_id: temp_user_dir)
+    monkeypatch.setattr(files_module, "user_dir", lambda user_id: temp_user_dir)
+    yield temp_user_dir
+    files_module._resolved_user_dir.cache_clear()
+
+@pytest.fixture
+def fake_db(app):
+    """Serve a FakeDB instead of the shared session mock for one test"""
+    from app.core.db import get_db
+
+    db = FakeDB()
+    previous = app.dependency_overrides[get_db]
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides[get_db] = previous
+
+@pytest.fixture
+def unauthenticated(app):
+    """Make get_current_user reject the request for the duration of a test"""
+    from fastapi import HTTPException
+    from app.deps import get_current_user
+
+    def _reject():
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    previous = app.dependency_overrides[get_current_user]
+    app.dependency_overrides[get_current_user] = _reject
+    yield
+    app.dependency_overrides[get_current_user] = previous
+
+_MULTIPART_BOUNDARY = "files-router-test-boundary"
+_MULTIPART_CT = f"multipart/form-data; boundary={_MULTIPART_BOUNDARY}"
+
+def _encode_multipart(parts, field="files"):
+    """Encode (filename, content, content_type) parts as a multipart/form-data body.
+
+    A filename of None omits the attribute, making the part a plain form field.
+    """
+    chunks = []
+    for filename, content, content_type in parts:
+        disposition = f'form-data; name="{field}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        chunks.append(
+            f"--{_MULTIPART_BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+            f"Content-Type: {content_type}\r\n\r\n".encode() + content + b"\r\n"
+        )
+    return b"".join(chunks) + f"--{_MULTIPART_BOUNDARY}--\r\n".encode()
+
+# Encoded once at import and reused across tests
+_NO_NAME_BODY = _encode_multipart([(None, b"content", "text/plain")])
+_EMPTY_NAME_BODY = _encode_multipart([("", b"content", "text/plain")])
+_TEXT_FILE_BODY = _encode_multipart([("test.txt", b"content", "text/plain")])
+_MULTI_BODY = _encode_multipart([
+    ("file1.txt", b"Content 1", "text/plain"),
+    ("file2.txt", b"Content 2", "text/plain"),
+    ("file3.pdf", b"PDF content", "application/pdf"),
+])
+
+def _wire_query(mock_db, *, all_=(), one=None):
+    """Set what the router's execute() result returns from .all() and .scalar_one_or_none()"""
+    mock_db.execute.return_value.configure_mock(
+        **{"all.return_value": list(all_), "scalar_one_or_none.return_value": one}
+    )
+
+class _FakeResult:
+    """The two result accessors the router uses"""
+
+    def __init__(self, docs):
+        self._docs = docs
+
+    def all(self):
+        return [(d.id, d.filename, d.created_at) for d in self._docs]
+
+    def scalar_one_or_none(self):
+        return self._docs[0] if self._docs else None
+
+class FakeDB:
+    """In-memory AsyncSession stand-in that serves back what upload inserted"""
+
+    def __init__(self):
+        self.docs = []
+        self.commits = 0
+
+    async def execute(self, statement, params):
+        if isinstance(params, list):  # executemany insert from upload_files
+            for row in params:
+                self.docs.append(SimpleNamespace(id=len(self.docs) + 1, created_at=datetime(2023, 1, 1), **row))
+            return None
+        owned = [d for d in self.docs if d.user_id == params["uid"]]
+        if "doc_id" in params:
+            owned = [d for d in owned if d.id == params["doc_id"]]
+        return _FakeResult(owned)
+
+    async def commit(self):
+        self.commits += 1
+
+def _gather_requests(app, *requests):
+    """Send (method, url, kwargs) requests concurrently to the app in one event loop.
+
+    Only for requests that need the same dependency overrides and query wiring.
+    """
+    import httpx
+
+    async def _send_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+            return await asyncio.gather(*(ac.request(method, url, **kwargs) for method, url, kwargs in requests))
+
+    return asyncio.run(_send_all())
+
+def _fake_upload_file(filename="test.txt", content=b"content"):
+    """The two UploadFile attributes upload_files reads"""
+    return SimpleNamespace(filename=filename, file=io.BytesIO(content))
+
+def _make_row(doc_id, filename, created_at):
+    """A list_files result row: the endpoint selects (id, filename, created_at)"""
+    return (doc_id, filename, created_at)
+
+def _inserted_rows(mock_db):
+    """Rows passed to the router's executemany insert"""
+    return mock_db.execute.await_args.args[1]
 
 class TestUploadFiles:
     """Test cases for the upload_files endpoint"""
-    
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_single_file_success(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
-        """Test successful upload of a single file"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create test file content
-        file_content = b"Test file content"
-        files = {"files": ("test.txt", io.BytesIO(file_content), "text/plain")}
-        
+
+    @pytest.mark.parametrize(
+        "filename,content,content_type",
+        [
+            ("test.txt", b"Test file content", "text/plain"),
+            ("large_file.bin", b"x" * LARGE_UPLOAD_BYTES, "application/octet-stream"),
+            ("test file (1) & copy.txt", b"content", "text/plain"),
+            ("empty.txt", b"", "text/plain"),
+        ],
+        ids=["single", "large", "special_characters", "zero_byte"],
+    )
+    def test_upload_payload(self, client, files_module, mock_user, mock_db, patched_user_dir, monkeypatch, filename, content, content_type):
+        """Test successful upload of a single file across payload shapes"""
+        monkeypatch.setattr(files_module, "UPLOAD_CHUNK_SIZE", _TEST_CHUNK_SIZE)
+        files = {"files": (filename, io.BytesIO(content), content_type)}
+
         # Make request
         response = client.post("/files/upload", files=files)
-        
+
         # Assertions
         assert response.status_code == 200
-        data = response.json()
-        assert "saved" in data
-        assert "test.txt" in data["saved"]
-        assert len(data["saved"]) == 1
-        
+        assert response.json() == {"saved": [filename]}
+
         # Verify database operations
-        mock_db.add.assert_called_once()
-        mock_db.commit.assert_called_once()
-        
+        mock_db.execute.assert_awaited_once()
+        assert _inserted_rows(mock_db) == [
+            {"user_id": mock_user.id, "filename": filename, "path": str(patched_user_dir / filename)}
+        ]
+        mock_db.commit.assert_awaited_once()
+
         # Verify file was written
-        written_file = temp_user_dir / "test.txt"
-        assert written_file.exists()
-        assert written_file.read_bytes() == file_content
-
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_multiple_files_success(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+        written_file = patched_user_dir / filename
+        assert written_file.stat().st_size == len(content)
+        assert written_file.read_bytes() == content
+
+    def test_upload_multiple_files_success(self, client, mock_user, mock_db, patched_user_dir):
         """Test successful upload of multiple files"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create test files
-        files = [
-            ("files", ("file1.txt", io.BytesIO(b"Content 1"), "text/plain")),
-            ("files", ("file2.txt", io.BytesIO(b"Content 2"), "text/plain")),
-            ("files", ("file3.pdf", io.BytesIO(b"PDF content"), "application/pdf"))
-        ]
-        
-        # Make request
-        response = client.post("/files/upload", files=files)
-        
+        # Make request with the body encoded once at import
+        response = client.post("/files/upload", content=_MULTI_BODY, headers={"content-type": _MULTIPART_CT})
+
         # Assertions
         assert response.status_code == 200
         data = response.json()
@@ -112,445 +280,191 @@ class TestUploadFiles:
         assert "file1.txt" in data["saved"]
         assert "file2.txt" in data["saved"]
         assert "file3.pdf" in data["saved"]
-        
-        # Verify database operations
-        assert mock_db.add.call_count == 3
-        mock_db.commit.assert_called_once()
-
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_file_invalid_filename(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
-        """Test upload with invalid filename raises HTTPException"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create file with no filename
-        files = {"files": (None, io.BytesIO(b"content"), "text/plain")}
-        
-        # Make request and expect error
-        response = client.post("/files/upload", files=files)
-        
+
+        # Verify database operations: one batched insert for all rows
+        mock_db.execute.assert_awaited_once()
+        assert len(_inserted_rows(mock_db)) == 3
+        mock_db.commit.assert_awaited_once()
+
+    def test_upload_file_invalid_filename(self, client, mock_user, mock_db, patched_user_dir):
+        """Test upload without a filename is rejected"""
+        # Make request and expect error: without a filename the part is a plain
+        # form field, so request validation rejects it before the handler runs
+        response = client.post("/files/upload", content=_NO_NAME_BODY, headers={"content-type": _MULTIPART_CT})
+
         # Assertions
-        assert response.status_code == 400
-        assert "Invalid filename" in response.json()["detail"]
-        
+        assert response.status_code == 422
+
         # Verify no database operations occurred
-        mock_db.add.assert_not_called()
+        mock_db.execute.assert_not_called()
         mock_db.commit.assert_not_called()
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_file_empty_filename(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_upload_file_empty_filename(self, client, mock_user, mock_db, patched_user_dir):
         """Test upload with empty filename raises HTTPException"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create file with empty filename
-        files = {"files": ("", io.BytesIO(b"content"), "text/plain")}
-        
-        # Make request and expect error
-        response = client.post("/files/upload", files=files)
-        
+        # The hand-built body keeps filename="" (httpx would drop it), so the
+        # part reaches the handler as an UploadFile and fails its filename check
+        response = client.post("/files/upload", content=_EMPTY_NAME_BODY, headers={"content-type": _MULTIPART_CT})
+
         # Assertions
         assert response.status_code == 400
         assert "Invalid filename" in response.json()["detail"]
+        mock_db.execute.assert_not_called()
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_file_special_characters_in_filename(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
-        """Test upload with special characters in filename"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create file with special characters
-        special_filename = "test file (1) & copy.txt"
-        files = {"files": (special_filename, io.BytesIO(b"content"), "text/plain")}
-        
-        # Make request
-        response = client.post("/files/upload", files=files)
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert special_filename in data["saved"]
-
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_large_file(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
-        """Test upload of a large file"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create large file content (1MB)
-        large_content = b"x" * (1024 * 1024)
-        files = {"files": ("large_file.bin", io.BytesIO(large_content), "application/octet-stream")}
-        
-        # Make request
-        response = client.post("/files/upload", files=files)
-        
-        # Assertions
-        assert response.status_code == 200
-        
-        # Verify file was written correctly
-        written_file = temp_user_dir / "large_file.bin"
-        assert written_file.exists()
-        assert written_file.stat().st_size == len(large_content)
-
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_file_database_error(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_upload_file_database_error(self, files_module, mock_user, mock_db, patched_user_dir):
         """Test upload with database error during commit"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
         mock_db.commit.side_effect = RuntimeError("Database error")
-        
-        # Create test file
-        files = {"files": ("test.txt", io.BytesIO(b"content"), "text/plain")}
-        
-        # Make request and expect error
+
+        # Call the endpoint directly: no HTTP round-trip or multipart parsing needed
         with pytest.raises(RuntimeError):
-            client.post("/files/upload", files=files)
+            asyncio.run(files_module.upload_files(files=[_fake_upload_file()], current_user=mock_user, db=mock_db))
 
 class TestListFiles:
     """Test cases for the list_files endpoint"""
-    
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_list_files_success(self, mock_get_db, mock_get_current_user, mock_user, mock_db):
-        """Test successful listing of files"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        
-        # Create mock documents
-        base_user_dir = Path(tempfile.gettempdir()) / "user_123"
-
-        doc1 = Mock(spec=Document)
-        doc1.id = 1
-        doc1.filename = "file1.txt"
-        doc1.path = str(base_user_dir / "file1.txt")
-        doc1.created_at.isoformat.return_value = "2023-01-01T00:00:00"
-        
-        doc2 = Mock(spec=Document)
-        doc2.id = 2
-        doc2.filename = "file2.pdf"
-        doc2.path = str(base_user_dir / "file2.pdf")
-        doc2.created_at.isoformat.return_value = "2023-01-02T00:00:00"
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_order_by = Mock()
-        
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.order_by.return_value = mock_order_by
-        mock_order_by.all.return_value = [doc1, doc2]
-        
-        # Make request
-        response = client.get("/files/")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data) == 2
-        
-        # Check first document
-        assert data[0]["id"] == 1
-        assert data[0]["filename"] == "file1.txt"
-        assert data[0]["path"] == str(base_user_dir / "file1.txt")
-        assert data[0]["created_at"] == "2023-01-01T00:00:00"
-        
-        # Check second document
-        assert data[1]["id"] == 2
-        assert data[1]["filename"] == "file2.pdf"
-        assert data[1]["path"] == str(base_user_dir / "file2.pdf")
-        assert data[1]["created_at"] == "2023-01-02T00:00:00"
-
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_list_files_empty(self, mock_get_db, mock_get_current_user, mock_user, mock_db):
-        """Test listing files when user has no files"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        
-        # Setup query chain to return empty list
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_order_by = Mock()
-        
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.order_by.return_value = mock_order_by
-        mock_order_by.all.return_value = []
-        
-        # Make request
-        response = client.get("/files/")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data) == 0
-        assert data == []
-
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_list_files_single_file(self, mock_get_db, mock_get_current_user, mock_user, mock_db):
-        """Test listing when user has exactly one file"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        
-        # Create single mock document
-        base_user_dir = Path(tempfile.gettempdir()) / "user_123"
-
-        doc = Mock(spec=Document)
-        doc.id = 42
-        doc.filename = "single_file.docx"
-        doc.path = str(base_user_dir / "single_file.docx")
-        doc.created_at.isoformat.return_value = "2023-06-15T14:30:00"
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_order_by = Mock()
-        
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.order_by.return_value = mock_order_by
-        mock_order_by.all.return_value = [doc]
-        
+
+    @pytest.mark.parametrize(
+        "rows",
+        [
+            [],
+            [_make_row(42, "single_file.docx", datetime(2023, 6, 15, 14, 30))],
+            [_make_row(1, "file1.txt", datetime(2023, 1, 1)), _make_row(2, "file2.pdf", datetime(2023, 1, 2))],
+        ],
+        ids=["empty", "single", "multiple"],
+    )
+    def test_list_files(self, client, mock_user, mock_db, rows):
+        """Test listing returns one entry per row, in query order"""
+        _wire_query(mock_db, all_=rows)
+
         # Make request
         response = client.get("/files/")
-        
+
         # Assertions
         assert response.status_code == 200
         data = response.json()
-        assert len(data) == 1
-        assert data[0]["id"] == 42
-        assert data[0]["filename"] == "single_file.docx"
+        assert len(data) == len(rows)
+        for item, (doc_id, filename, created_at) in zip(data, rows):
+            assert item == {"id": doc_id, "filename": filename, "created_at": created_at.isoformat()}
+
+    def test_list_query_breaks_created_at_ties_by_id(self):
+        """Test documents stored in the same second still list newest first"""
+        from app.routers.files import _DOCS_BY_USER
+
+        assert str(_DOCS_BY_USER).endswith("ORDER BY documents.created_at DESC, documents.id DESC")
 
 class TestDownloadFile:
     """Test cases for the download_file endpoint"""
-    
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_success(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+
+    def test_download_file_success(self, client, mock_user, mock_db, patched_user_dir, mock_document):
         """Test successful file download"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         # Create test file
-        test_file = temp_user_dir / "download_test.txt"
+        test_file = patched_user_dir / "download_test.txt"
         test_content = "This is test content for download"
         test_file.write_text(test_content)
-        
+
         # Create mock document
-        doc = Mock(spec=Document)
-        doc.id = 1
+        doc = mock_document
         doc.filename = "download_test.txt"
         doc.path = str(test_file)
-        doc.user_id = 123
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = doc
-        
+
+        # Setup query result
+        _wire_query(mock_db, one=doc)
+
         # Make request
         response = client.get("/files/download/1")
-        
+
         # Assertions
         assert response.status_code == 200
         assert response.headers["content-disposition"] == 'attachment; filename="download_test.txt"'
-        
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_not_found(self, mock_get_db, mock_get_current_user, mock_user, mock_db):
+
+    def test_download_file_not_found(self, client, mock_user, mock_db):
         """Test download when file document doesn't exist in database"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        
-        # Setup query chain to return None
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = None
-        
+        # Setup query to return None
+        _wire_query(mock_db, one=None)
+
         # Make request
         response = client.get("/files/download/999")
-        
+
         # Assertions
         assert response.status_code == 404
         assert "File not found" in response.json()["detail"]
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_missing_on_disk(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_download_file_missing_on_disk(self, client, mock_user, mock_db, patched_user_dir, mock_document):
         """Test download when file exists in database but not on disk"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         # Create mock document pointing to non-existent file
-        missing_file_path = temp_user_dir / "missing_file.txt"
-        doc = Mock(spec=Document)
-        doc.id = 1
+        missing_file_path = patched_user_dir / "missing_file.txt"
+        doc = mock_document
         doc.filename = "missing_file.txt"
         doc.path = str(missing_file_path)
-        doc.user_id = 123
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = doc
-        
+
+        # Setup query result
+        _wire_query(mock_db, one=doc)
+
         # Make request
         response = client.get("/files/download/1")
-        
+
         # Assertions
         assert response.status_code == 404
         assert "File missing on disk" in response.json()["detail"]
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_path_traversal_attack(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_download_file_path_traversal_attack(self, client, mock_user, mock_db, patched_user_dir, mock_document):
         """Test download prevents path traversal attacks"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         # Create mock document with malicious path outside user directory
         malicious_path = "/etc/passwd"  # Trying to access system file
-        doc = Mock(spec=Document)
-        doc.id = 1
+        doc = mock_document
         doc.filename = "passwd"
         doc.path = malicious_path
-        doc.user_id = 123
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = doc
-        
+
+        # Setup query result
+        _wire_query(mock_db, one=doc)
+
         # Make request
         response = client.get("/files/download/1")
-        
+
         # Assertions
         assert response.status_code == 403
         assert "Access denied" in response.json()["detail"]
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_different_user(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_download_file_different_user(self, client, mock_user, mock_db, patched_user_dir):
         """Test download when file belongs to different user"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user  # user_id = 123
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create mock document belonging to different user
-        doc = Mock(spec=Document)
-        doc.id = 1
-        doc.filename = "other_user_file.txt"
-        doc.path = str(Path(tempfile.gettempdir()) / "user_456" / "other_user_file.txt")
-        doc.user_id = 456  # Different user ID
-        
         # Setup query to simulate filter by user_id and doc_id
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = None  # Would not find document due to user filter
-        
+        _wire_query(mock_db, one=None)  # Would not find document due to user filter
+
         # Make request
         response = client.get("/files/download/1")
-        
+
         # Assertions
         assert response.status_code == 404
         assert "File not found" in response.json()["detail"]
+        assert mock_db.execute.await_args.args[1] == {"doc_id": 1, "uid": mock_user.id}
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_download_file_with_unicode_filename(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_download_file_with_unicode_filename(self, client, mock_user, mock_db, patched_user_dir, mock_document):
         """Test download with Unicode characters in filename"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         # Create test file with Unicode name
         unicode_filename = "测试文件.txt"
-        test_file = temp_user_dir / unicode_filename
-        test_file.write_text("Unicode test content")
-        
+        test_file = patched_user_dir / unicode_filename
+        # Only the headers are checked, so an empty file satisfies the existence check
+        test_file.touch()
+
         # Create mock document
-        doc = Mock(spec=Document)
-        doc.id = 1
+        doc = mock_document
         doc.filename = unicode_filename
         doc.path = str(test_file)
-        doc.user_id = 123
-        
-        # Setup query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.first.return_value = doc
-        
+
+        # Setup query result
+        _wire_query(mock_db, one=doc)
+
         # Make request
         response = client.get("/files/download/1")
-        
+
         # Assertions
         assert response.status_code == 200
-        assert unicode_filename in response.headers["content-disposition"]
+        # Non-ASCII names are sent RFC 5987-encoded
+        assert quote(unicode_filename) in response.headers["content-disposition"]
 
 class TestFileRouterIntegration:
     """Integration tests for the complete file router workflow"""
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_list_download_workflow(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_upload_list_download_workflow(self, client, mock_user, fake_db, patched_user_dir):
         """Test complete workflow: upload -> list -> download"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-
         # Upload
         file_content = b"Integration test content"
         filename = "integration_test.txt"
@@ -558,188 +472,91 @@ class TestFileRouterIntegration:
         upload_response = client.post("/files/upload", files=files)
         assert upload_response.status_code == 200
         assert filename in upload_response.json()["saved"]
+        assert fake_db.commits == 1
 
         # Verify file exists on disk
-        uploaded_file = temp_user_dir / filename
+        uploaded_file = patched_user_dir / filename
         assert uploaded_file.exists()
         assert uploaded_file.read_bytes() == file_content
 
-        # Prepare a mock Document returned by list & download queries
-        doc = Mock(spec=Document)
-        doc.id = 99
-        doc.filename = filename
-        doc.path = str(uploaded_file)
-        # created_at.isoformat used by the list endpoint
-        doc.created_at = Mock()
-        doc.created_at.isoformat.return_value = "2023-01-01T00:00:00"
-
-        # Configure list query chain
-        mock_query = Mock()
-        mock_filter = Mock()
-        mock_order_by = Mock()
-        mock_db.query.return_value = mock_query
-        mock_query.filter.return_value = mock_filter
-        mock_filter.order_by.return_value = mock_order_by
-        mock_order_by.all.return_value = [doc]
-
-        # List
+        # List: the inserted row comes back
         list_response = client.get("/files/")
         assert list_response.status_code == 200
         data = list_response.json()
-        assert any(item["filename"] == filename for item in data)
+        assert [item["filename"] for item in data] == [filename]
 
-        # Configure download query chain
-        mock_query2 = Mock()
-        mock_filter2 = Mock()
-        mock_db.query.return_value = mock_query2
-        mock_query2.filter.return_value = mock_filter2
-        mock_filter2.first.return_value = doc
-
-        # Download
-        dl_response = client.get("/files/download/99")
+        # Download by the listed id
+        dl_response = client.get(f"/files/download/{data[0]['id']}")
         assert dl_response.status_code == 200
         assert dl_response.content == file_content
 
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_overwrite_existing_file(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+    def test_upload_overwrite_existing_file(self, client, mock_user, mock_db, patched_user_dir):
         """Test uploading a file with the same name overwrites existing file"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         filename = "overwrite_test.txt"
-        
+
         # Upload first file
         first_content = b"Original content"
         files = {"files": (filename, io.BytesIO(first_content), "text/plain")}
         response1 = client.post("/files/upload", files=files)
         assert response1.status_code == 200
-        
+
         # Verify first file content
-        test_file = temp_user_dir / filename
+        test_file = patched_user_dir / filename
         assert test_file.read_bytes() == first_content
-        
+
         # Upload second file with same name
         second_content = b"Updated content - should overwrite"
         files = {"files": (filename, io.BytesIO(second_content), "text/plain")}
         response2 = client.post("/files/upload", files=files)
         assert response2.status_code == 200
-        
+
         # Verify file was overwritten
         assert test_file.read_bytes() == second_content
 
 class TestErrorHandling:
     """Test error handling scenarios"""
-    
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_unauthorized_access_upload(self, _mock_get_db, mock_get_current_user):
-        """Test upload without authentication"""
-        mock_get_current_user.side_effect = HTTPException(status_code=401, detail="Not authenticated")
-        
-        files = {"files": ("test.txt", io.BytesIO(b"content"), "text/plain")}
-        response = client.post("/files/upload", files=files)
-        
-        assert response.status_code == 401
-
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_unauthorized_access_list(self, _mock_get_db, mock_get_current_user):
-        """Test list files without authentication"""
-        mock_get_current_user.side_effect = HTTPException(status_code=401, detail="Not authenticated")
-        
-        response = client.get("/files/")
-        
-        assert response.status_code == 401
-
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_unauthorized_access_download(self, _mock_get_db, mock_get_current_user):
-        """Test download without authentication"""
-        mock_get_current_user.side_effect = HTTPException(status_code=401, detail="Not authenticated")
-        
-        response = client.get("/files/download/1")
-        
-        assert response.status_code == 401
+
+    def test_unauthorized_access(self, app, unauthenticated):
+        """Test every endpoint rejects requests without authentication"""
+        responses = _gather_requests(
+            app,
+            ("post", "/files/upload", {"content": _TEXT_FILE_BODY, "headers": {"content-type": _MULTIPART_CT}}),
+            ("get", "/files/", {}),
+            ("get", "/files/download/1", {}),
+        )
+
+        assert [r.status_code for r in responses] == [401, 401, 401]
 
 class TestEdgeCases:
     """Test edge cases and boundary conditions"""
-    
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_zero_byte_file(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
-        """Test uploading an empty (0 bytes) file"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
-        # Create empty file
-        files = {"files": ("empty.txt", io.BytesIO(b""), "text/plain")}
-        
-        # Make request
-        response = client.post("/files/upload", files=files)
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert "empty.txt" in data["saved"]
-        
-        # Verify empty file was created
-        empty_file = temp_user_dir / "empty.txt"
-        assert empty_file.exists()
-        assert empty_file.stat().st_size == 0
-
-    @patch('backend.api.routers.files.ensure_user_dir')
-    @patch('backend.api.routers.files.get_current_user')
-    @patch('backend.api.routers.files.get_db')
-    def test_upload_filename_with_path_separators(self, mock_get_db, mock_get_current_user, mock_ensure_user_dir, mock_user, mock_db, temp_user_dir):
+
+    def test_upload_filename_with_path_separators(self, client, mock_user, mock_db, patched_user_dir):
         """Test uploading file with path separators in filename"""
-        # Setup mocks
-        mock_get_current_user.return_value = mock_user
-        mock_get_db.return_value = mock_db
-        mock_ensure_user_dir.return_value = temp_user_dir
-        
         # Filename with path separators (potential security risk)
         malicious_filename = "../../malicious.txt"
         files = {"files": (malicious_filename, io.BytesIO(b"content"), "text/plain")}
-        
+
         # Make request
         response = client.post("/files/upload", files=files)
-        
+
         # Should succeed but sanitize filename
         assert response.status_code == 200
         # File should be created with the provided filename (current implementation doesn't sanitize)
         # In a production system, you might want to add filename sanitization
-        
-    def test_download_invalid_doc_id_types(self):
+
+    def test_download_invalid_doc_id_types(self, app, mock_user, mock_db):
         """Test download with invalid document ID types"""
-        # Test with string that's not a number
-        response = client.get("/files/download/not_a_number")
-        assert response.status_code == 422  # FastAPI validation error
-        
-        # Test with negative number
-        with patch('backend.api.routers.files.get_current_user') as mock_get_current_user, \
-             patch('backend.api.routers.files.get_db') as mock_get_db:
-            mock_user = Mock()
-            mock_user.id = 123
-            mock_get_current_user.return_value = mock_user
-            mock_db = Mock()
-            mock_get_db.return_value = mock_db
-            
-            # Setup query to return None for negative ID
-            mock_query = Mock()
-            mock_filter = Mock()
-            mock_db.query.return_value = mock_query
-            mock_query.filter.return_value = mock_filter
-            mock_filter.first.return_value = None
-            
-            response = client.get("/files/download/-1")
-            assert response.status_code == 404
+        # Negative ids pass validation, then the query returns None
+        _wire_query(mock_db, one=None)
+
+        not_a_number, negative = _gather_requests(
+            app,
+            ("get", "/files/download/not_a_number", {}),
+            ("get", "/files/download/-1", {}),
+        )
+
+        assert not_a_number.status_code == 422  # FastAPI validation error
+        assert negative.status_code == 404
 
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
@@ -1,410 +1,336 @@
 # Testing library/framework: pytest
-import sys
+import asyncio
 import types
-import importlib
-import threading
-import pytest
-
-
-@pytest.fixture
-def health_module(monkeypatch):
-    """
-    Import backend.tests.test_health_router safely by stubbing external deps:
-    - fastapi.APIRouter (for decorator only)
-    - sqlalchemy.text (return passthrough string)
-    - backend.core.db.engine (placeholder; will be patched per test)
-    """
-    # Stub fastapi with minimal APIRouter supporting @router.get decorator
-    fastapi_stub = types.ModuleType("fastapi")
+from contextlib import nullcontext
 
-    class APIRouter:
-        def __init__(self, *args, **kwargs):
-            pass
+import pytest
 
-        def get(self, _path):
-            def decorator(fn):
-                return fn
-            return decorator
+# Created once; tests swap their callables instead of installing new modules
+_SOCK_STUB = types.ModuleType("socket")
+_PS_STUB = types.ModuleType("psutil")
 
-    fastapi_stub.APIRouter = APIRouter
-    monkeypatch.setitem(sys.modules, "fastapi", fastapi_stub)
 
-    # Stub sqlalchemy.text
-    sqlalchemy_stub = types.ModuleType("sqlalchemy")
+@pytest.fixture(scope="module")
+def health_module():
+    """
+    Import app.routers.health once and point its external dependencies at stubs:
+    - socket (the internet probe's DNS lookup and TCP connect)
+    - psutil, with the /proc/meminfo fast path switched off so every platform reads it
+    - health_engine (placeholder; health_env installs a fresh one per test)
 
-    def text(q):
-        return q
+    The stubs and the import are set up once per module; health_env resets
+    the per-test pieces.
+    """
+    import importlib
 
-    sqlalchemy_stub.text = text
-    monkeypatch.setitem(sys.modules, "sqlalchemy", sqlalchemy_stub)
+    mp = pytest.MonkeyPatch()
+    mod = importlib.import_module("app.routers.health")
 
-    # Ensure 'backend' pkg exists (namespace) and stub backend.core.db.engine
-    backend_mod = sys.modules.get("backend")
-    if backend_mod is None:
-        backend_mod = types.ModuleType("backend")
-        backend_mod.__path__ = ["backend"]
-        monkeypatch.setitem(sys.modules, "backend", backend_mod)
+    _SOCK_STUB.SOCK_STREAM = mod.socket.SOCK_STREAM
+    mp.setattr(mod, "socket", _SOCK_STUB)
+    mp.setattr(mod, "_psutil", _PS_STUB)
+    mp.setattr(mod, "_HAVE_PROC_MEMINFO", False)
+    mp.setattr(mod, "health_engine", make_engine())
+    try:
+        yield mod
+    finally:
+        mp.undo()
 
-    core_mod = sys.modules.get("backend.core")
-    if core_mod is None:
-        core_mod = types.ModuleType("backend.core")
-        core_mod.__path__ = []
-        monkeypatch.setitem(sys.modules, "backend.core", core_mod)
 
-    db_mod = types.ModuleType("backend.core.db")
+@pytest.fixture
+def health_env(health_module, monkeypatch):
+    """Healthy defaults for every check, and no cached report or DNS answer; tests override the piece they exercise."""
+    monkeypatch.setattr(health_module, "health_engine", make_engine(), raising=True)
+    monkeypatch.setattr(health_module, "_cached_report", None)
+    monkeypatch.setattr(health_module, "_probe_addrs", None)
+    # asyncio.run() starts a new loop per test; the lock must not stay bound to an old one
+    monkeypatch.setattr(health_module, "_refresh_lock", asyncio.Lock())
+    install_socket(monkeypatch)
+    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    class _DummyConn:
-        def execute(self, _q):
-            return None
 
-    class _DummyCtx:
-        def __enter__(self):
-            return _DummyConn()
+@pytest.fixture(scope="module")
+def pool():
+    from concurrent.futures import ThreadPoolExecutor
 
-        def __exit__(self, exc_type, exc, tb):
-            return False
+    ex = ThreadPoolExecutor(max_workers=5)
+    yield ex
+    ex.shutdown()
 
-    class DummyEngine:
-        def connect(self):
-            return _DummyCtx()
 
-    db_mod.engine = DummyEngine()
-    monkeypatch.setitem(sys.modules, "backend.core.db", db_mod)
+def _run(coro):
+    """Run one probe coroutine to completion outside the app."""
+    return asyncio.run(coro)
 
-    # Make sure requests/psutil are not preloaded so tests can control them
-    sys.modules.pop("requests", None)
-    sys.modules.pop("psutil", None)
 
-    # Import the module under test
-    mod = importlib.import_module("backend.tests.test_health_router")
-    return mod
+# Helpers to stub external dependencies
 
+_PROBE_ADDRINFO = [
+    (2, 1, 6, "", ("192.0.2.1", 443)),
+    (2, 1, 6, "", ("192.0.2.2", 443)),
+]
 
-# Helpers to stub external dependencies
 
-def install_requests(monkeypatch, *, status_code=204, exc=None, capture=None):
+def install_socket(monkeypatch, *, exc=None, capture=None):
     """
-    Install a stub 'requests' module.
-    - If exc is provided, requests.get raises that exception.
-    - capture: dict to record url and timeout
+    Point the stub 'socket' module's getaddrinfo/create_connection at canned results.
+    - If exc is provided, socket.create_connection raises that exception.
+    - capture: dict to record the looked-up host/port, lookup count and connect targets/timeout
     """
-    req = types.ModuleType("requests")
-
-    class _Resp:
-        def __init__(self, sc):
-            self.status_code = sc
 
-    if exc is None:
-        def get(url, timeout):
-            if capture is not None:
-                capture["url"] = url
-                capture["timeout"] = timeout
-            return _Resp(status_code)
-    else:
-        def get(url, timeout):
-            if capture is not None:
-                capture["url"] = url
-                capture["timeout"] = timeout
+    def getaddrinfo(host, port, type=0):
+        if capture is not None:
+            capture["lookup"] = (host, port)
+            capture["lookups"] = capture.get("lookups", 0) + 1
+        return _PROBE_ADDRINFO
+
+    def create_connection(address, timeout):
+        if capture is not None:
+            capture.setdefault("addresses", []).append(address)
+            capture["timeout"] = timeout
+        if exc is not None:
             raise exc
+        return nullcontext()
 
-    req.get = get
-    monkeypatch.setitem(sys.modules, "requests", req)
-    return req
+    monkeypatch.setattr(_SOCK_STUB, "getaddrinfo", getaddrinfo, raising=False)
+    monkeypatch.setattr(_SOCK_STUB, "create_connection", create_connection, raising=False)
+    return _SOCK_STUB
+
+
+class _VM:
+    """psutil.virtual_memory() result; sizes in bytes."""
+    __slots__ = ("total", "available", "percent")
+
+    def __init__(self, total, available, percent):
+        self.total = total
+        self.available = available
+        self.percent = percent
 
 
 def install_psutil(monkeypatch, *, total_mb=8192.0, available_mb=4096.0, percent=50.0, exc=None):
     """
-    Install a stub 'psutil' module.
+    Point the stub 'psutil' module's virtual_memory at canned figures.
     - If exc is provided, psutil.virtual_memory raises that exception.
     """
-    p = types.ModuleType("psutil")
 
     if exc is None:
-        class VM:
-            def __init__(self, t_mb, a_mb, pct):
-                self.total = int(t_mb * 1024 * 1024)
-                self.available = int(a_mb * 1024 * 1024)
-                self.percent = pct
+        total = int(total_mb * 1024 * 1024)
+        available = int(available_mb * 1024 * 1024)
 
         def virtual_memory():
-            return VM(total_mb, available_mb, percent)
+            return _VM(total, available, percent)
     else:
         def virtual_memory():
             raise exc
 
-    p.virtual_memory = virtual_memory
-    monkeypatch.setitem(sys.modules, "psutil", p)
-    return p
-
-
-# Engine stubs per scenario
-
-class EngineSuccess:
-    def connect(self):
-        class Ctx:
-            def __enter__(self):
-                class Conn:
-                    def execute(self, _q):
-                        return None
-                return Conn()
-
-            def __exit__(self, a, b, c):
-                return False
-        return Ctx()
+    monkeypatch.setattr(_PS_STUB, "virtual_memory", virtual_memory, raising=False)
+    return _PS_STUB
 
 
-class EngineConnectFail:
-    def __init__(self, exc):
-        self.exc = exc
-
-    def connect(self):
-        raise self.exc
+# Engine stub, parameterised per scenario
 
+class _Engine:
+    """
+    Stands in for health_engine, its connect() context and the connection at once,
+    so a probe allocates nothing. Records the last executed query and counts connects.
+    """
+    __slots__ = ("_connect_exc", "_execute_exc", "last_query", "connects")
 
-class EngineExecuteFail:
-    def __init__(self, exc):
-        self.exc = exc
+    def __init__(self, connect_exc, execute_exc):
+        self._connect_exc = connect_exc
+        self._execute_exc = execute_exc
+        self.last_query = None
+        self.connects = 0
 
     def connect(self):
-        exc = self.exc
-
-        class Ctx:
-            def __enter__(self):
-                class Conn:
-                    def execute(self_inner, _q):
-                        raise exc
-                return Conn()
-
-            def __exit__(self, a, b, c):
-                return False
-        return Ctx()
+        self.connects += 1
+        if self._connect_exc is not None:
+            raise self._connect_exc
+        return self
 
+    async def __aenter__(self):
+        return self
 
-class EngineTrack:
-    """Tracks the last query passed to execute."""
-    def __init__(self):
-        self.last_query = None
+    async def __aexit__(self, a, b, c):
+        return False
 
-    def connect(self):
-        outer = self
+    async def execute(self, q):
+        self.last_query = q
+        if self._execute_exc is not None:
+            raise self._execute_exc
+        return None
 
-        class Ctx:
-            def __enter__(self):
-                class Conn:
-                    def execute(self_inner, q):
-                        outer.last_query = q
-                        return None
-                return Conn()
 
-            def __exit__(self, a, b, c):
-                return False
-        return Ctx()
+def make_engine(*, connect_exc=None, execute_exc=None):
+    """Engine whose connect() or execute() raises the given exception, if any."""
+    return _Engine(connect_exc, execute_exc)
 
 
 # Tests
 
-def test_health_all_checks_ok(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+def test_checks_all_ok(health_module, health_env):
+    checks = _run(health_module._run_checks())
+    assert checks["database"] == {"ok": True, "detail": "connected"}
+    assert checks["internet"] == {"ok": True, "detail": "tcp_ok"}
+    assert checks["memory"]["ok"] is True
+    assert checks["memory"]["detail"] == {"total_mb": 8192.0, "available_mb": 4096.0, "percent": 50.0}
 
-    data = health_module.health()
-    assert data["status"] == "ok"
-    assert data["checks"]["database"]["ok"] is True
-    assert data["checks"]["database"]["detail"] == "connected"
-    assert data["checks"]["internet"]["ok"] is True
-    assert data["checks"]["internet"]["detail"] == "status=204"
-    assert data["checks"]["memory"]["ok"] is True
-    assert data["checks"]["memory"]["detail"]["total_mb"] == 8192.0
-    assert data["checks"]["memory"]["detail"]["available_mb"] == 4096.0
-    assert data["checks"]["memory"]["detail"]["percent"] == 50.0
-
-
-def test_health_database_connect_failure(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineConnectFail(Exception("Connection failed")), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["database"]["ok"] is False
-    assert "Connection failed" in data["checks"]["database"]["detail"]
-    assert data["checks"]["internet"]["ok"] is True
-    assert data["checks"]["memory"]["ok"] is True
+def test_database_connect_failure(health_module, health_env, monkeypatch):
+    monkeypatch.setattr(health_module, "health_engine", make_engine(connect_exc=Exception("Connection failed")), raising=True)
 
+    result = _run(health_module._check_database())
+    assert result["ok"] is False
+    assert "Connection failed" in result["detail"]
 
-def test_health_database_sql_execution_failure(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineExecuteFail(Exception("SQL execution failed")), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["database"]["ok"] is False
-    assert "SQL execution failed" in data["checks"]["database"]["detail"]
+def test_database_sql_execution_failure(health_module, health_env, monkeypatch):
+    monkeypatch.setattr(health_module, "health_engine", make_engine(execute_exc=Exception("SQL execution failed")), raising=True)
 
+    result = _run(health_module._check_database())
+    assert result["ok"] is False
+    assert "SQL execution failed" in result["detail"]
 
-def test_health_internet_exception(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, exc=Exception("Connection timed out"))
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["database"]["ok"] is True
-    assert data["checks"]["internet"]["ok"] is False
-    assert "Connection timed out" in data["checks"]["internet"]["detail"]
-    assert data["checks"]["memory"]["ok"] is True
+def test_database_executes_prebuilt_select_1(health_module, health_env, monkeypatch):
+    tracker = make_engine()
+    monkeypatch.setattr(health_module, "health_engine", tracker, raising=True)
 
+    _run(health_module._check_database())
+    assert tracker.last_query is health_module._PING_SQL
+    assert str(tracker.last_query) == "SELECT 1"
 
-def test_health_internet_bad_status(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=500)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["internet"]["ok"] is False
-    assert data["checks"]["internet"]["detail"] == "status=500"
+def test_internet_connect_failure(health_module, health_env, monkeypatch):
+    install_socket(monkeypatch, exc=OSError("Connection refused"))
 
+    result = _run(health_module._check_internet())
+    assert result == {"ok": False, "detail": "Connection refused"}
 
-@pytest.mark.parametrize("status_code,expected_ok", [(200, True), (204, True), (404, False), (500, False)])
-def test_health_internet_various_status_codes(health_module, monkeypatch, status_code, expected_ok):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=status_code)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
 
-    data = health_module.health()
-    assert data["checks"]["internet"]["ok"] is expected_ok
-    assert data["checks"]["internet"]["detail"] == f"status={status_code}"
-    assert data["status"] == ("ok" if expected_ok else "degraded")
+def test_internet_probe_address_and_timeout(health_module, health_env, monkeypatch):
+    capture = {}
+    install_socket(monkeypatch, capture=capture)
 
+    _run(health_module._check_internet())
+    assert capture["lookup"] == health_module.INTERNET_PROBE_ADDRESS
+    assert capture["addresses"] == [("192.0.2.1", 443)]
+    assert capture["timeout"] == health_module.INTERNET_PROBE_TIMEOUT_SECONDS
 
-def test_health_memory_exception(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, exc=Exception("psutil error"))
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["memory"]["ok"] is False
-    assert "psutil error" in data["checks"]["memory"]["detail"]
+def test_internet_dns_answer_reused(health_module, health_env, monkeypatch):
+    capture = {}
+    install_socket(monkeypatch, capture=capture)
 
+    for _ in range(3):
+        health_module._tcp_connect()
+    assert capture["lookups"] == 1
+    assert len(capture["addresses"]) == 3
 
-def test_health_low_memory_condition(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    # 50 MB available -> below 100MB threshold
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=50.0, percent=99.4)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["memory"]["ok"] is False
-    assert data["checks"]["memory"]["detail"]["available_mb"] == 50.0
-    assert data["checks"]["memory"]["detail"]["percent"] == 99.4
+def test_internet_failing_address_moves_to_back(health_module, health_env, monkeypatch):
+    capture = {}
+    install_socket(monkeypatch, exc=OSError("unreachable"), capture=capture)
 
+    with pytest.raises(OSError, match="unreachable"):
+        health_module._tcp_connect()
+    with pytest.raises(OSError, match="unreachable"):
+        health_module._tcp_connect()
+    assert capture["addresses"] == [("192.0.2.1", 443), ("192.0.2.2", 443)]
 
-def test_health_memory_exact_threshold(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    # Exactly 100 MB available -> still not ok (>100MB required)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=100.0, percent=98.8)
 
-    data = health_module.health()
-    assert data["status"] == "degraded"
-    assert data["checks"]["memory"]["ok"] is False
-    assert data["checks"]["memory"]["detail"]["available_mb"] == 100.0
+def test_internet_concurrent_connects(health_module, health_env, monkeypatch, pool):
+    # The blocking connect runs in worker threads in production; several may overlap
+    capture = {}
+    install_socket(monkeypatch, capture=capture)
 
+    results = list(pool.map(lambda _: health_module._tcp_connect(), range(5)))
 
-def test_health_memory_just_above_threshold(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    # 101 MB available -> ok
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=101.0, percent=98.7)
+    assert results == [None] * 5
+    assert len(capture["addresses"]) == 5
 
-    data = health_module.health()
-    assert data["status"] == "ok"
-    assert data["checks"]["memory"]["ok"] is True
-    assert data["checks"]["memory"]["detail"]["available_mb"] == 101.0
 
+def test_memory_exception(health_module, health_env, monkeypatch):
+    install_psutil(monkeypatch, exc=Exception("psutil error"))
 
-def test_health_memory_calculation_rounding(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    # 8GB/4GB exact in bytes to verify rounding to 1 decimal
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+    result = _run(health_module._check_memory())
+    assert result["ok"] is False
+    assert "psutil error" in result["detail"]
 
-    data = health_module.health()
-    assert data["status"] == "ok"
-    assert data["checks"]["memory"]["detail"]["total_mb"] == 8192.0
-    assert data["checks"]["memory"]["detail"]["available_mb"] == 4096.0
-    assert data["checks"]["memory"]["detail"]["percent"] == 50.0
 
+def test_memory_without_psutil(health_module, health_env, monkeypatch):
+    monkeypatch.setattr(health_module, "_psutil", None)
 
-def test_health_response_structure(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+    result = _run(health_module._check_memory())
+    assert result == {"ok": False, "detail": "No module named 'psutil'"}
 
-    data = health_module.health()
-    assert "status" in data and isinstance(data["status"], str)
-    assert "checks" in data and isinstance(data["checks"], dict)
-    for key in ("database", "internet", "memory"):
-        assert key in data["checks"]
-        assert "ok" in data["checks"][key]
-        assert "detail" in data["checks"][key]
 
+@pytest.mark.parametrize("available_mb,percent,expected_ok", [
+    (50.0, 99.4, False),  # below the 100MB threshold
+    (100.0, 98.8, False),  # exactly 100MB is still not ok (>100MB required)
+    (101.0, 98.7, True),
+    (4096.0, 50.0, True),  # 8GB/4GB exact in bytes to verify rounding to 1 decimal
+])
+def test_memory_threshold(health_module, health_env, monkeypatch, available_mb, percent, expected_ok):
+    install_psutil(monkeypatch, total_mb=8192.0, available_mb=available_mb, percent=percent)
 
-def test_health_requests_timeout_argument(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    capture = {}
-    install_requests(monkeypatch, status_code=204, capture=capture)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+    result = _run(health_module._check_memory())
+    assert result["ok"] is expected_ok
+    assert result["detail"]["total_mb"] == 8192.0
+    assert result["detail"]["available_mb"] == available_mb
+    assert result["detail"]["percent"] == percent
 
-    _ = health_module.health()
-    assert capture.get("url") == "https://www.google.com/generate_204"
-    assert capture.get("timeout") == 3
 
+def test_parse_meminfo(health_module):
+    data = b"MemTotal:        8000000 kB\nMemFree:          100000 kB\nMemAvailable:    2000000 kB\n"
 
-def test_health_executes_select_1(health_module, monkeypatch):
-    tracker = EngineTrack()
-    monkeypatch.setattr(health_module, "engine", tracker, raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+    info = health_module._parse_meminfo(data)
+    assert info.total == 8000000 * 1024
+    assert info.available == 2000000 * 1024
+    assert info.percent == 75.0
 
-    _ = health_module.health()
-    # Our sqlalchemy.text stub returns the raw string query
-    assert tracker.last_query == "SELECT 1"
 
+def test_parse_meminfo_zero_total(health_module):
+    info = health_module._parse_meminfo(b"MemTotal: 0 kB\nMemAvailable: 0 kB\n")
+    assert info.percent == 0.0
 
-def test_health_multiple_failures(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineConnectFail(Exception("DB error")), raising=True)
-    install_requests(monkeypatch, exc=Exception("Network error"))
+
+def test_report_multiple_failures(health_module, health_env, monkeypatch):
+    monkeypatch.setattr(health_module, "health_engine", make_engine(connect_exc=Exception("DB error")), raising=True)
+    install_socket(monkeypatch, exc=OSError("Network error"))
     install_psutil(monkeypatch, exc=Exception("psutil not available"))
 
-    data = health_module.health()
+    _, data, body = _run(health_module._current_report())
     assert data["status"] == "degraded"
     assert data["checks"]["database"]["ok"] is False and "DB error" in data["checks"]["database"]["detail"]
     assert data["checks"]["internet"]["ok"] is False and "Network error" in data["checks"]["internet"]["detail"]
     assert data["checks"]["memory"]["ok"] is False and "psutil not available" in data["checks"]["memory"]["detail"]
+    assert body == health_module.orjson.dumps(data)
 
 
-def test_health_concurrent_calls(health_module, monkeypatch):
-    monkeypatch.setattr(health_module, "engine", EngineSuccess(), raising=True)
-    install_requests(monkeypatch, status_code=204)
-    install_psutil(monkeypatch, total_mb=8192.0, available_mb=4096.0, percent=50.0)
+def test_report_cached_until_expiry(health_module, health_env, monkeypatch):
+    tracker = make_engine()
+    monkeypatch.setattr(health_module, "health_engine", tracker, raising=True)
+
+    first = _run(health_module._current_report())
+    assert _run(health_module._current_report()) is first
+    assert tracker.connects == 1
+
+    # An expired report is replaced by a fresh run of the checks
+    monkeypatch.setattr(health_module, "_cached_report", (0.0,) + first[1:])
+    assert _run(health_module._current_report()) is not first
+    assert tracker.connects == 2
+
 
-    results = []
+def test_report_concurrent_callers_share_one_refresh(health_module, health_env, monkeypatch):
+    tracker = make_engine()
+    monkeypatch.setattr(health_module, "health_engine", tracker, raising=True)
 
-    def worker():
-        data = health_module.health()
-        results.append(data["status"])
+    async def _many():
+        return await asyncio.gather(*(health_module._current_report() for _ in range(5)))
 
-    threads = [threading.Thread(target=worker) for _ in range(5)]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+    reports = _run(_many())
 
-    assert all(status == "ok" for status in results)
-    assert len(results) == 5
\ No newline at end of file
+    assert all(report is reports[0] for report in reports)
+    assert reports[0][1]["status"] == "ok"
+    assert tracker.connects == 1
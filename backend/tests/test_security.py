@@ -1,326 +1,418 @@
 # Testing framework: pytest
 # These tests validate the security utilities focusing on hashing and JWT handling.
-# Frameworks/Libraries used: pytest, unittest.mock (patch), python-jose
+# Frameworks/Libraries used: pytest (monkeypatch), bcrypt
+import base64
+import hashlib
+import hmac
+import json
+import time
 import pytest
 from datetime import datetime, timedelta, timezone
-from unittest.mock import patch
-from jose import JWTError, jwt as jose_jwt
+from types import SimpleNamespace
 
 import sys
 import os
 # Ensure 'backend' (parent of tests) is on the path to import 'app.core.security'
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from app.core.security import (
-    hash_password,
-    verify_password,
-    create_access_token,
-    decode_token,
-    PASSWORD_CONTEXT,
-    JWT_SECRET,
-    JWT_ALGORITHM,
-    JWT_EXPIRE_MINUTES
-)
+
+@pytest.fixture(scope="session")
+def sec():
+    """app.core.security, imported on first use so `-k` runs skip it when not needed."""
+    from app.core import security
+
+    return SimpleNamespace(**{name: getattr(security, name) for name in (
+        "hash_password",
+        "verify_password",
+        "create_access_token",
+        "decode_token",
+        "needs_rehash",
+        "JWT_SECRET",
+        "JWT_ALGORITHM",
+        "JWT_EXPIRE_MINUTES",
+    )})
+
+
+def _fixed_datetime(t: datetime):
+    class _FixedDT:
+        now = staticmethod(lambda tz=None: t)
+    return _FixedDT
+
+
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """Pin app.core.security's clock so token expiry can be asserted exactly."""
+    t = datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    monkeypatch.setattr("app.core.security.datetime", _fixed_datetime(t))
+    return t
+
+
+@pytest.fixture(scope="session")
+def default_token(sec):
+    """(token, issued_at) for "test_user" with the default expiry, created once."""
+    issued_at = datetime.now(timezone.utc).replace(microsecond=0)
+    mp = pytest.MonkeyPatch()
+    mp.setattr("app.core.security.datetime", _fixed_datetime(issued_at))
+    try:
+        return sec.create_access_token("test_user"), issued_at
+    finally:
+        mp.undo()
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def encode_jwt(payload: dict, secret: str, algorithm: str = "HS256") -> str:
+    """Independent reference JWT encoder used to forge tokens for negative tests."""
+    digestmod = {"HS256": hashlib.sha256, "HS512": hashlib.sha512}[algorithm]
+    header = _b64url(json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode())
+    claims = dict(payload)
+    if isinstance(claims.get("exp"), datetime):
+        claims["exp"] = int(claims["exp"].timestamp())
+    body = _b64url(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = f"{header}.{body}".encode()
+    signature = _b64url(hmac.new(secret.encode(), signing_input, digestmod).digest())
+    return f"{header}.{body}.{signature}"
+
+
+VARIOUS_PASSWORDS = [
+    "short",
+    "a" * 100,
+    "pássw0rd_ñ",
+    "p@$$w0rd\\!@#$%^&*()",
+    "MixedCasePassword123",
+    "123456789",
+    "password with spaces",
+]
+
+
+@pytest.fixture(scope="session")
+def hashed_corpus(sec):
+    """bcrypt hashes for every password the tests verify against, computed once."""
+    corpus = [
+        "correct_password123",
+        "some_pwd",
+        "my_secure_password123\\!",
+        "SecureP@ssw0rd123\\!",
+        *VARIOUS_PASSWORDS,
+    ]
+    return {pwd: sec.hash_password(pwd) for pwd in corpus}
+
+
+@pytest.fixture(scope="session")
+def wrong_secret_token(sec):
+    expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+    return encode_jwt({"sub": "test_user", "exp": expire}, "wrong_secret_key", algorithm=sec.JWT_ALGORITHM)
+
+
+@pytest.fixture(scope="session")
+def wrong_alg_token(sec):
+    expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+    return encode_jwt({"sub": "test_user", "exp": expire}, sec.JWT_SECRET, algorithm="HS512")
 
 
 class TestPasswordFunctions:
-    def test_hash_password_basic(self):
+    def test_hash_password_basic(self, sec):
         password = "test_password123"
-        hashed = hash_password(password)
+        hashed = sec.hash_password(password)
         assert hashed and isinstance(hashed, str) and hashed != password
 
-    def test_hash_password_different_passwords_different_hashes(self):
-        assert hash_password("password123") != hash_password("different_password456")
+    def test_hash_password_different_passwords_different_hashes(self, sec):
+        assert sec.hash_password("password123") != sec.hash_password("different_password456")
 
-    def test_hash_password_same_password_different_hashes_due_to_salt(self):
+    def test_hash_password_same_password_different_hashes_due_to_salt(self, sec):
         password = "same_password"
-        assert hash_password(password) != hash_password(password)
+        assert sec.hash_password(password) != sec.hash_password(password)
 
-    def test_hash_password_empty_string(self):
-        hashed = hash_password("")
+    def test_hash_password_empty_string(self, sec):
+        hashed = sec.hash_password("")
         assert hashed and isinstance(hashed, str)
 
-    def test_hash_password_special_and_unicode_characters(self):
+    def test_hash_password_special_and_unicode_characters(self, sec):
         for pwd in ("p@ssw0rd\\!#$%^&*()", "pássw0rd_ñoñó_测试"):
-            assert hash_password(pwd)
-
-    def test_hash_password_very_long(self):
-        assert hash_password("a" * 1000)
+            assert sec.hash_password(pwd)
 
-    def test_verify_password_correct(self):
+    def test_verify_password_correct(self, sec, hashed_corpus):
         pwd = "correct_password123"
-        hashed = hash_password(pwd)
-        assert verify_password(pwd, hashed) is True
+        assert sec.verify_password(pwd, hashed_corpus[pwd]) is True
 
-    def test_verify_password_incorrect(self):
-        pwd = "correct_password123"
-        hashed = hash_password(pwd)
-        assert verify_password("wrong_password456", hashed) is False
+    def test_verify_password_incorrect(self, sec, hashed_corpus):
+        hashed = hashed_corpus["correct_password123"]
+        assert sec.verify_password("wrong_password456", hashed) is False
 
-    def test_verify_password_empty_password(self):
-        hashed = hash_password("some_pwd")
-        assert verify_password("", hashed) is False
+    def test_verify_password_empty_password(self, sec, hashed_corpus):
+        assert sec.verify_password("", hashed_corpus["some_pwd"]) is False
 
-    def test_verify_password_empty_or_invalid_hash_raises(self):
-        # Passlib CryptContext.verify typically raises for invalid format/hash
+    def test_verify_password_empty_or_invalid_hash_raises(self, sec):
+        # bcrypt.checkpw raises ValueError for an invalid salt/hash
 
         with pytest.raises(Exception):
-            verify_password("some_pwd", "")
+            sec.verify_password("some_pwd", "")
         with pytest.raises(Exception):
-            verify_password("some_pwd", "not_a_valid_hash_format")
+            sec.verify_password("some_pwd", "not_a_valid_hash_format")
 
-    def test_verify_password_none_values_raise_typeerror(self):
+    def test_verify_password_none_values_raise_typeerror(self, sec):
         with pytest.raises(TypeError):
-            verify_password(None, "some_hash")  # type: ignore[arg-type]
+            sec.verify_password(None, "some_hash")  # type: ignore[arg-type]
         with pytest.raises(TypeError):
-            verify_password("password", None)  # type: ignore[arg-type]
-
-    def test_password_context_has_hash_and_verify(self):
-        assert PASSWORD_CONTEXT is not None
-        assert callable(getattr(PASSWORD_CONTEXT, "hash", None))
-        assert callable(getattr(PASSWORD_CONTEXT, "verify", None))
+            sec.verify_password("password", None)  # type: ignore[arg-type]
+
+    def test_hash_password_uses_bcrypt_format(self, sec):
+        hashed = sec.hash_password("some_pwd")
+        assert hashed.startswith("$bcrypt-sha256$2b$")
+        assert sec.needs_rehash(hashed) is False
+
+    def test_hash_password_distinguishes_beyond_72_bytes(self, sec):
+        prefix = "a" * 72
+        hashed = sec.hash_password(prefix + "one")
+        assert sec.verify_password(prefix + "one", hashed) is True
+        assert sec.verify_password(prefix + "two", hashed) is False
+
+    def test_verify_password_plain_bcrypt_hash(self, sec):
+        # Written before passwords were SHA-256 pre-hashed
+        import bcrypt
+        plain = bcrypt.hashpw(b"plain_password", bcrypt.gensalt(rounds=4)).decode("ascii")
+        assert sec.verify_password("plain_password", plain) is True
+        assert sec.verify_password("wrong_password", plain) is False
+        assert sec.needs_rehash(plain) is True
+
+    def test_verify_password_legacy_pbkdf2_hash(self, sec):
+        # Produced by the former passlib CryptContext default (pbkdf2_sha256)
+        legacy = "$pbkdf2-sha256$29000$jVFqrbVWSgnh3HuPUer9vw$RDg6KMUFbBJYJEM.U0bJ8pYnmBlSygRbdmidUbFjL2E"
+        assert sec.verify_password("legacy_password", legacy) is True
+        assert sec.verify_password("wrong_password", legacy) is False
+        assert sec.needs_rehash(legacy) is True
 
 
 class TestJWTTokenFunctions:
-    def test_create_access_token_default_expiration_and_decode(self):
-        subject = "test_user"
-        token = create_access_token(subject)
+    def test_create_access_token_default_expiration_and_decode(self, sec, default_token):
+        token, issued_at = default_token
         assert token and isinstance(token, str)
-        decoded = decode_token(token)
+        decoded = sec.decode_token(token)
         assert decoded is not None
-        assert decoded["sub"] == subject
+        assert decoded["sub"] == "test_user"
         assert "exp" in decoded
         assert isinstance(decoded["exp"], int)
+        exp_dt = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
+        assert exp_dt == issued_at + timedelta(minutes=sec.JWT_EXPIRE_MINUTES)
 
-    def test_create_access_token_custom_expiration(self):
+    def test_create_access_token_custom_expiration(self, sec):
         subject = "test_user"
         custom_minutes = 30
-        token = create_access_token(subject, custom_minutes)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject, custom_minutes)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == subject
 
-    def test_create_access_token_zero_expiration(self):
+    def test_create_access_token_zero_expiration(self, sec):
         subject = "test_user"
-        token = create_access_token(subject, 0)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject, 0)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == subject
 
-    def test_create_access_token_negative_expiration_creates_expired(self):
+    def test_create_access_token_negative_expiration_creates_expired(self, sec):
         subject = "test_user"
-        token = create_access_token(subject, -60)  # expired
-        assert decode_token(token) is None
+        token = sec.create_access_token(subject, -60)  # expired
+        assert sec.decode_token(token) is None
 
-    def test_create_access_token_empty_subject(self):
-        token = create_access_token("")
-        decoded = decode_token(token)
+    def test_create_access_token_empty_subject(self, sec):
+        token = sec.create_access_token("")
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == ""
 
-    def test_create_access_token_none_subject_raises(self):
+    def test_create_access_token_none_subject_raises(self, sec):
         with pytest.raises(TypeError):
-            create_access_token(None)  # type: ignore[arg-type]
+            sec.create_access_token(None)  # type: ignore[arg-type]
 
-    def test_create_access_token_special_characters_subject(self):
+    def test_create_access_token_special_characters_subject(self, sec):
         subject = "user@example.com\\!#$%"
-        token = create_access_token(subject)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == subject
 
-    def test_create_access_token_unicode_subject(self):
+    def test_create_access_token_unicode_subject(self, sec):
         subject = "üser_测试_ñoñó"
-        token = create_access_token(subject)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == subject
 
-    def test_decode_token_valid(self):
-        subject = "valid_user"
-        token = create_access_token(subject)
-        decoded = decode_token(token)
+    def test_decode_token_valid(self, sec, default_token):
+        token, _ = default_token
+        decoded = sec.decode_token(token)
         assert isinstance(decoded, dict)
-        assert decoded["sub"] == subject
+        assert decoded["sub"] == "test_user"
         assert "exp" in decoded and isinstance(decoded["exp"], int)
 
-    def test_decode_token_invalid_format(self):
-        assert decode_token("not.a.valid.jwt.token") is None
+    def test_decode_token_invalid_format(self, sec):
+        assert sec.decode_token("not.a.valid.jwt.token") is None
 
-    def test_decode_token_empty_string(self):
-        assert decode_token("") is None
+    def test_decode_token_empty_string(self, sec):
+        assert sec.decode_token("") is None
 
-    def test_decode_token_none_raises_typeerror(self):
+    def test_decode_token_none_raises_typeerror(self, sec):
         with pytest.raises(TypeError):
-            decode_token(None)  # type: ignore[arg-type]
+            sec.decode_token(None)  # type: ignore[arg-type]
 
-    def test_decode_token_malformed_jwt_variants(self):
-        for token in ["invalid", "still.invalid", "header.payload", "a.b.c.d"]:
-            assert decode_token(token) is None
+    @pytest.mark.parametrize("token", ["invalid", "still.invalid", "header.payload", "a.b.c.d"])
+    def test_decode_token_malformed_jwt_variants(self, sec, token):
+        assert sec.decode_token(token) is None
 
-    def test_decode_token_wrong_secret(self):
-        subject = "test_user"
-        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
-        payload = {"sub": subject, "exp": expire}
-        wrong_secret = "wrong_secret_key"
-        token = jose_jwt.encode(payload, wrong_secret, algorithm=JWT_ALGORITHM)
-        assert decode_token(token) is None
+    def test_decode_token_wrong_secret(self, sec, wrong_secret_token):
+        assert sec.decode_token(wrong_secret_token) is None
 
-    def test_decode_token_wrong_algorithm(self):
-        subject = "test_user"
+    def test_decode_token_wrong_algorithm(self, sec, wrong_alg_token):
+        assert sec.decode_token(wrong_alg_token) is None
+
+    def test_decode_token_accepts_reference_encoding(self, sec):
         expire = datetime.now(timezone.utc) + timedelta(minutes=30)
-        payload = {"sub": subject, "exp": expire}
-        token = jose_jwt.encode(payload, JWT_SECRET, algorithm="HS512")
-        assert decode_token(token) is None
+        token = encode_jwt({"sub": "test_user", "exp": expire}, sec.JWT_SECRET)
+        decoded = sec.decode_token(token)
+        assert decoded is not None and decoded["sub"] == "test_user"
+
+    def test_decode_token_tampered_payload(self, sec):
+        header, _, signature = sec.create_access_token("test_user").split(".")
+        forged = _b64url(json.dumps({"sub": "admin", "exp": 4102444800}).encode())
+        assert sec.decode_token(f"{header}.{forged}.{signature}") is None
 
 
 class TestSecurityConstants:
-    def test_jwt_secret_exists(self):
-        assert isinstance(JWT_SECRET, str) and len(JWT_SECRET) > 0
+    def test_jwt_secret_exists(self, sec):
+        assert isinstance(sec.JWT_SECRET, str) and len(sec.JWT_SECRET) > 0
 
-    def test_jwt_algorithm_valid(self):
-        assert JWT_ALGORITHM == "HS256"
+    def test_jwt_algorithm_valid(self, sec):
+        assert sec.JWT_ALGORITHM == "HS256"
 
-    def test_jwt_expire_minutes_positive_and_reasonable(self):
-        assert isinstance(JWT_EXPIRE_MINUTES, int) and JWT_EXPIRE_MINUTES > 0
-        assert 5 <= JWT_EXPIRE_MINUTES <= 24 * 60
+    def test_jwt_expire_minutes_positive_and_reasonable(self, sec):
+        assert isinstance(sec.JWT_EXPIRE_MINUTES, int) and sec.JWT_EXPIRE_MINUTES > 0
+        assert 5 <= sec.JWT_EXPIRE_MINUTES <= 24 * 60
 
 
 class TestTokenExpiration:
-    def test_token_expiration_boundary_value_from_fixed_time(self):
-        # Freeze creation time within create_access_token by patching datetime in module
+    def test_token_expiration_boundary_value_from_fixed_time(self, sec, frozen_now):
+        # Creation and decoding both read the frozen app.core.security clock
         subject = "test_user"
         expire_minutes = 60
-        fixed_time = datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
-        with patch("app.core.security.datetime") as mock_dt:
-            mock_dt.now.return_value = fixed_time
-            token = create_access_token(subject, expire_minutes)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject, expire_minutes)
+        decoded = sec.decode_token(token)
         assert decoded is not None
         exp_dt = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
-        expected = fixed_time + timedelta(minutes=expire_minutes)
-        assert abs((exp_dt - expected).total_seconds()) <= 1.0
+        assert exp_dt == frozen_now + timedelta(minutes=expire_minutes)
 
-    def test_token_creation_time_accuracy(self):
+    def test_token_creation_time_accuracy(self, sec):
         before = datetime.now(timezone.utc)
-        token = create_access_token("test_user", 60)
+        token = sec.create_access_token("test_user", 60)
         after = datetime.now(timezone.utc)
-        decoded = decode_token(token)
+        decoded = sec.decode_token(token)
         assert decoded is not None
         exp_dt = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
         assert (before + timedelta(minutes=59, seconds=30)) <= exp_dt <= (after + timedelta(minutes=60, seconds=30))
 
 
 class TestErrorHandling:
-    def test_hash_password_passlib_exception(self, monkeypatch):
+    def test_hash_password_bcrypt_exception(self, sec, monkeypatch):
         def _raise(*args, **kwargs):
-            raise Exception("Passlib error")
-        monkeypatch.setattr("app.core.security.PASSWORD_CONTEXT.hash", _raise)
-        with pytest.raises(Exception):
-            hash_password("test_password")
+            raise Exception("bcrypt error")
+        monkeypatch.setattr("app.core.security.bcrypt.hashpw", _raise)
+        with pytest.raises(Exception, match="bcrypt error"):
+            sec.hash_password("test_password")
 
-    def test_verify_password_passlib_exception(self, monkeypatch):
+    def test_verify_password_bcrypt_exception(self, sec, monkeypatch):
         def _raise(*args, **kwargs):
-            raise Exception("Passlib error")
-        monkeypatch.setattr("app.core.security.PASSWORD_CONTEXT.verify", _raise)
-        with pytest.raises(Exception):
-            verify_password("password", "hash")
+            raise Exception("bcrypt error")
+        monkeypatch.setattr("app.core.security.bcrypt.checkpw", _raise)
+        with pytest.raises(Exception, match="bcrypt error"):
+            sec.verify_password("password", "hash")
 
-    def test_create_access_token_jwt_exception(self, monkeypatch):
+    def test_create_access_token_jwt_exception(self, sec, monkeypatch):
         def _raise(*args, **kwargs):
             raise Exception("JWT encoding error")
-        monkeypatch.setattr("app.core.security.jwt.encode", _raise)
-        with pytest.raises(Exception):
-            create_access_token("test_user")
+        monkeypatch.setattr("app.core.security.orjson.dumps", _raise)
+        with pytest.raises(Exception, match="JWT encoding error"):
+            sec.create_access_token("test_user")
 
-    def test_decode_token_jwt_error_handling(self, monkeypatch):
+    def test_decode_token_jwt_error_handling(self, sec, monkeypatch):
+        token = sec.create_access_token("test_user")
         def _raise(*args, **kwargs):
-            raise JWTError("Invalid token")
-        monkeypatch.setattr("app.core.security.jwt.decode", _raise)
-        assert decode_token("some_token") is None
+            raise ValueError("Invalid token")
+        monkeypatch.setattr("app.core.security.orjson.loads", _raise)
+        assert sec.decode_token(token) is None
 
-    def test_decode_token_general_exception_propagates(self, monkeypatch):
+    def test_decode_token_general_exception_propagates(self, sec, monkeypatch):
+        token = sec.create_access_token("test_user")
         def _raise(*args, **kwargs):
             raise Exception("Unexpected error")
-        monkeypatch.setattr("app.core.security.jwt.decode", _raise)
-        with pytest.raises(Exception):
-            decode_token("some_token")
+        monkeypatch.setattr("app.core.security.orjson.loads", _raise)
+        with pytest.raises(Exception, match="Unexpected error"):
+            sec.decode_token(token)
 
 
 class TestIntegrationScenarios:
-    def test_complete_password_workflow(self):
+    def test_complete_password_workflow(self, sec, hashed_corpus):
         original_password = "my_secure_password123\\!"
-        hashed = hash_password(original_password)
-        assert verify_password(original_password, hashed) is True
-        assert verify_password("wrong_password", hashed) is False
-        for _ in range(3):
-            assert verify_password(original_password, hashed) is True
+        hashed = hashed_corpus[original_password]
+        assert sec.verify_password(original_password, hashed) is True
+        assert sec.verify_password("wrong_password", hashed) is False
 
-    def test_complete_token_workflow(self):
+    def test_complete_token_workflow(self, sec, frozen_now):
         subject = "user123@example.com"
         custom_expiration = 120  # 2 hours
-        token = create_access_token(subject, custom_expiration)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject, custom_expiration)
+        decoded = sec.decode_token(token)
         assert decoded is not None
         assert decoded["sub"] == subject
         assert "exp" in decoded
         exp_time = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
-        now = datetime.now(timezone.utc)
-        diff = exp_time - now
-        assert timedelta(minutes=119) <= diff <= timedelta(minutes=121)
+        assert exp_time - frozen_now == timedelta(minutes=custom_expiration)
 
-    def test_multiple_users_get_unique_tokens(self):
+    def test_multiple_users_get_unique_tokens(self, sec):
         users = ["user1", "user2@example.com", "admin", "test_user_123"]
-        tokens = [create_access_token(u) for u in users]
+        tokens = [sec.create_access_token(u) for u in users]
         for u, t in zip(users, tokens):
-            d = decode_token(t)
+            d = sec.decode_token(t)
             assert d is not None and d["sub"] == u
         assert len(set(tokens)) == len(tokens)
 
-    def test_password_and_token_combined_flow(self):
+    def test_password_and_token_combined_flow(self, sec, hashed_corpus):
         username = "john.doe@company.com"
         password = "SecureP@ssw0rd123\\!"
-        password_hash = hash_password(password)
-        assert verify_password(password, password_hash) is True
-        token = create_access_token(username)
-        decoded = decode_token(token)
+        password_hash = hashed_corpus[password]
+        assert sec.verify_password(password, password_hash) is True
+        token = sec.create_access_token(username)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == username
-        assert verify_password("WrongPassword123\\!", password_hash) is False
+        assert sec.verify_password("WrongPassword123\\!", password_hash) is False
 
 
 class TestPerformance:
-    def test_password_hashing_performance(self):
-        import time
-        start = time.time()
-        hash_password("test_password_for_performance")
-        duration = time.time() - start
+    @pytest.mark.slow
+    def test_password_hashing_performance(self, sec):
+        start = time.perf_counter()
+        sec.hash_password("test_password_for_performance")
+        duration = time.perf_counter() - start
         # Generous upper bound to avoid CI flakiness
         assert duration < 3.0
 
-    def test_token_operations_performance(self):
-        import time
+    @pytest.mark.slow
+    def test_token_operations_performance(self, sec):
         subject = "performance_test_user"
-        start = time.time()
-        token = create_access_token(subject)
-        creation_time = time.time() - start
+        start = time.perf_counter()
+        token = sec.create_access_token(subject)
+        creation_time = time.perf_counter() - start
 
-        start = time.time()
-        decode_token(token)
-        decoding_time = time.time() - start
+        start = time.perf_counter()
+        sec.decode_token(token)
+        decoding_time = time.perf_counter() - start
 
         assert creation_time < 1.0
         assert decoding_time < 1.0
 
 
 class TestParametrizedScenarios:
-    @pytest.mark.parametrize("password", [
-        "short",
-        "a" * 100,
-        "pássw0rd_ñ",
-        "p@$$w0rd\\!@#$%^&*()",
-        "MixedCasePassword123",
-        "123456789",
-        "password with spaces",
-    ])
-    def test_password_hashing_various_inputs(self, password):
-        hashed = hash_password(password)
+    @pytest.mark.parametrize("password", VARIOUS_PASSWORDS)
+    def test_password_hashing_various_inputs(self, sec, password, hashed_corpus):
+        hashed = hashed_corpus[password]
         assert hashed and isinstance(hashed, str)
-        assert verify_password(password, hashed) is True
+        assert sec.verify_password(password, hashed) is True
 
     @pytest.mark.parametrize("subject", [
         "simple_user",
@@ -331,20 +423,18 @@ class TestParametrizedScenarios:
         "user with spaces",
         "user@domain.com\\!special",
     ])
-    def test_token_creation_various_subjects(self, subject):
-        token = create_access_token(subject)
-        decoded = decode_token(token)
+    def test_token_creation_various_subjects(self, sec, subject):
+        token = sec.create_access_token(subject)
+        decoded = sec.decode_token(token)
         assert decoded is not None and decoded["sub"] == subject
 
     @pytest.mark.parametrize("expiration_minutes", [
-        1, 15, 60, 120, 24 * 60, 7 * 24 * 60
+        1, 15, 60, 120, 24 * 60
     ])
-    def test_token_expiration_various_durations(self, expiration_minutes):
+    def test_token_expiration_various_durations(self, sec, frozen_now, expiration_minutes):
         subject = "test_user"
-        token = create_access_token(subject, expiration_minutes)
-        decoded = decode_token(token)
+        token = sec.create_access_token(subject, expiration_minutes)
+        decoded = sec.decode_token(token)
         assert decoded is not None
         exp_time = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
-        expected = datetime.now(timezone.utc) + timedelta(minutes=expiration_minutes)
-        # Allow 60s tolerance for execution overhead
-        assert abs((exp_time - expected).total_seconds()) <= 60
\ No newline at end of file
+        assert exp_time == frozen_now + timedelta(minutes=expiration_minutes)
\ No newline at end of file
@@ -1,7 +1,3 @@
-import json
-import sys
-from typing import Any, Dict
-
 """
 A minimal JSON-RPC style stdio loop you can adapt for MCP.
 This is intentionally lightweight and framework-agnostic.
@@ -16,6 +12,30 @@ Methods implemented:
 - call_tool: { name: "echo", args: { text: "..." } } -> echoes back
 """
 
+import io
+import json
+import sys
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+
+    def _dump_line(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:  # orjson is optional; stdlib json needs the frame as bytes
+    def _loads(data: memoryview) -> Any:
+        return json.loads(bytes(data))
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def _dump_line(obj: Any) -> bytes:
+        return (json.dumps(obj) + "\n").encode()
+
+
 TOOLS = [
     {
         "name": "echo",
@@ -24,44 +44,150 @@ TOOLS = [
     }
 ]
 
+# TOOLS never changes, so list_tools results are serialized once. handle_request
+# returns them under RAW_RESULT and main() splices the bytes into the response.
+RAW_RESULT = "_raw_result"
+_TOOLS_RESULT_BYTES = _dumps(TOOLS)
+
+
+def _echo(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"text": args.get("text", "")}
+
+
+_TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "echo": _echo,
+}
+
+
+def _handle_list_tools(params: Dict[str, Any]) -> bytes:
+    return _TOOLS_RESULT_BYTES
+
+
+def _handle_call_tool(params: Dict[str, Any]) -> Any:
+    name = params.get("name")
+    tool = _TOOL_HANDLERS.get(name)
+    if tool is None:
+        raise ValueError(f"Unknown tool: {name}")
+    return tool(params.get("args", {}))
+
+
+# Each handler takes the request params and returns the result; bytes are
+# already-serialized JSON
+_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "list_tools": _handle_list_tools,
+    "call_tool": _handle_call_tool,
+}
 
-def handle_request(req: Dict[str, Any]) -> Dict[str, Any]:
+
+_OUTCOME_KEYS = ("result", "error", RAW_RESULT)
+
+
+def handle_request(req: Dict[str, Any], resp: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the response for req; when resp is given it is refilled in place and returned."""
+    if resp is None:
+        resp = {}
     _id = req.get("id")
     method = req.get("method")
     params = req.get("params", {})
 
+    # "id" stays the first key; only the previous outcome is dropped
+    resp["id"] = _id
+    for key in _OUTCOME_KEYS:
+        resp.pop(key, None)
     try:
-        if method == "list_tools":
-            return {"id": _id, "result": TOOLS}
-        elif method == "call_tool":
-            name = params.get("name")
-            args = params.get("args", {})
-            if name == "echo":
-                text = args.get("text", "")
-                return {"id": _id, "result": {"text": text}}
-            else:
-                raise ValueError(f"Unknown tool: {name}")
-        else:
+        handler = _HANDLERS.get(method)
+        if handler is None:
             raise ValueError(f"Unknown method: {method}")
+        result = handler(params)
+        resp[RAW_RESULT if isinstance(result, bytes) else "result"] = result
     except Exception as e:  # noqa: BLE001
-        return {"id": _id, "error": {"message": str(e)}}
+        resp["error"] = {"message": str(e)}
+    return resp
 
 
-def main() -> None:
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            req = json.loads(line)
-        except json.JSONDecodeError as e:
-            sys.stdout.write(json.dumps({"id": None, "error": {"message": f"Invalid JSON: {e}"}}) + "\n")
-            sys.stdout.flush()
+READ_SIZE = 65536
+WRITE_BUFFER_SIZE = 65536
+
+
+_BLANK = frozenset(b" \t\r")
+
+
+def _has_content(data: bytes, start: int, end: int) -> bool:
+    # Only frames that start with whitespace pay for the full isspace() scan
+    return end > start and (data[start] not in _BLANK or not data[start:end].isspace())
+
+
+def iter_frames(stream: BinaryIO, before_read: Optional[Callable[[], None]] = None) -> Iterator[memoryview]:
+    """
+    Yield newline-delimited frames, reading stdin in blocks rather than line by line.
+    Frames are memoryview slices of the block just read, so they reach the parser
+    without a per-frame copy; blank lines are skipped. before_read runs ahead of
+    each (possibly blocking) read, once the frames already buffered have been consumed.
+    """
+    pending: List[bytes] = []  # blocks holding the start of a frame that has not ended yet
+    while True:
+        if before_read is not None:
+            before_read()
+        chunk = stream.read1(READ_SIZE)
+        if not chunk:
+            break
+        last = chunk.rfind(b"\n")
+        if last == -1:
+            pending.append(chunk)
             continue
+        # Only a frame split across reads is copied, when its pieces are joined once
+        if pending:
+            pending.append(chunk)
+            data = b"".join(pending)
+            last += len(data) - len(chunk)
+        else:
+            data = chunk
+        view = memoryview(data)
+        start = 0
+        while start <= last:
+            end = data.index(b"\n", start)
+            if _has_content(data, start, end):
+                yield view[start:end]
+            start = end + 1
+        pending = [data[last + 1:]] if last + 1 < len(data) else []
+    tail = b"".join(pending)
+    if _has_content(tail, 0, len(tail)):
+        yield memoryview(tail)
+
+
+def _write_raw(out: BinaryIO, req_id: Any, raw: bytes) -> None:
+    # Splice an already-serialized result (e.g. the cached tool list) into the
+    # response line; only the id is encoded per request
+    out.write(b'{"id":' + _dumps(req_id) + b',"result":' + raw + b"}\n")
+
 
-        resp = handle_request(req)
-        sys.stdout.write(json.dumps(resp) + "\n")
-        sys.stdout.flush()
+def main() -> None:
+    # Responses are flushed once per input block (before the next read could
+    # block) or when the buffer fills, not once per response
+    out = io.BufferedWriter(sys.stdout.buffer, buffer_size=WRITE_BUFFER_SIZE)
+    # Refilled by handle_request for every request instead of allocating a new dict
+    resp: Dict[str, Any] = {}
+    try:
+        for line in iter_frames(sys.stdin.buffer, before_read=out.flush):
+            try:
+                req = _loads(line)
+            except ValueError as e:  # JSONDecodeError, including orjson's, and bad UTF-8
+                out.write(_dump_line({"id": None, "error": {"message": f"Invalid JSON: {e}"}}))
+                continue
+
+            if req.get("method") == "list_tools":
+                # Hot discovery call: only the id varies, so skip dispatch entirely
+                _write_raw(out, req.get("id"), _TOOLS_RESULT_BYTES)
+                continue
+
+            handle_request(req, resp)
+            raw = resp.get(RAW_RESULT)
+            if raw is not None:
+                _write_raw(out, resp["id"], raw)
+            else:
+                out.write(_dump_line(resp))
+    finally:
+        out.flush()
 
 
 if __name__ == "__main__":
@@ -1,18 +1,87 @@
 import pytest
 from unittest.mock import Mock
-from sqlalchemy.orm import Session
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
 import secrets
 
+from app.models import User
+from app.schemas import UserCreate
+
+# Random per run so no test can depend on a known password
+_SAMPLE_PASSWORD = secrets.token_urlsafe(16)
+
+# Attributes restored on the shared user mocks before every test
+_EXISTING_USER_ATTRS = {"id": 1, "email": "test@example.com", "password_hash": "hashed_password"}
+_VALID_USER_ATTRS = {"id": 1, "email": "test@example.com", "password_hash": "hashed_password123"}
+# Mock(spec=User) introspects the model, so tests draw from a prebuilt pool
+_USER_POOL_SIZE = 16
+
+
+def _user_mock(attrs):
+    user = Mock(spec=User)
+    user.configure_mock(**attrs)
+    return user
 
-@pytest.fixture
-def mock_db_session():
-    """Shared mock database session fixture."""
-    return Mock(spec=Session)
+
+@pytest.fixture(scope="session")
+def _user_mock_pool():
+    pool = [Mock(spec=User) for _ in range(_USER_POOL_SIZE)]
+    # Attributes present before any test sets e.g. user.email on a pooled mock
+    return [(user, frozenset(vars(user))) for user in pool]
 
 
 @pytest.fixture
-def sample_user_data():
-    """Shared sample user data fixture."""
-    from app.schemas import UserCreate
-    password = secrets.token_urlsafe(16)
-    return UserCreate(email="test@example.com", password=password)
\ No newline at end of file
+def user_mock_factory(_user_mock_pool):
+    """Hand out pooled Mock(spec=User) objects in turn, each reset to a fresh state."""
+    pool = iter(_user_mock_pool)
+
+    def factory():
+        user, baseline = next(pool)
+        user.reset_mock(return_value=True, side_effect=True)
+        # reset_mock keeps plain attribute values; drop them so spec'd child mocks come back
+        for name in vars(user).keys() - baseline:
+            del vars(user)[name]
+        return user
+    return factory
+
+
+@pytest.fixture(scope="session")
+def _mock_result():
+    return Mock(spec=Result)
+
+
+@pytest.fixture(scope="session")
+def mock_db(_mock_result):
+    """Shared mock database session fixture, built once and reset before every test."""
+    db = Mock(spec=AsyncSession)
+    db.execute.return_value = _mock_result
+    return db
+
+
+@pytest.fixture(scope="session")
+def existing_user():
+    """Mock user already registered under the sample email."""
+    return _user_mock(_EXISTING_USER_ATTRS)
+
+
+@pytest.fixture(scope="session")
+def valid_user():
+    """Mock user returned by the login lookup."""
+    return _user_mock(_VALID_USER_ATTRS)
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_mocks(mock_db, _mock_result, existing_user, valid_user):
+    # reset_mock(return_value=True) also drops execute's configured result
+    mock_db.reset_mock(return_value=True, side_effect=True)
+    _mock_result.reset_mock(return_value=True, side_effect=True)
+    mock_db.execute.return_value = _mock_result
+    for user, attrs in ((existing_user, _EXISTING_USER_ATTRS), (valid_user, _VALID_USER_ATTRS)):
+        user.reset_mock()
+        user.configure_mock(**attrs)
+
+
+@pytest.fixture(scope="session")
+def user_data():
+    """Shared sample user data fixture, validated once per session; treat as read-only."""
+    return UserCreate(email="test@example.com", password=_SAMPLE_PASSWORD)
@@ -1,103 +1,84 @@
+import asyncio
+import socket
+import time
+from contextlib import ExitStack, contextmanager
+
 import pytest
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, patch, AsyncMock, call
 from sqlalchemy.exc import SQLAlchemyError
-from requests.exceptions import RequestException, Timeout
 import psutil
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 
-# Import the health router - adjusting import based on typical FastAPI structure
-# Assuming the health endpoint is in a module that can be imported
-try:
-    from ..core.db import engine  # Try relative import first
-except ImportError:
-    try:
-        from src.core.db import engine  # Try src structure
-    except ImportError:
-        from core.db import engine  # Try direct import
-
-# Create a test app with just the health router for isolated testing
-@pytest.fixture
+from app.routers import health
+
+
+# Create a test app with just the health router for isolated testing; no test
+# changes the app itself, so one instance serves the whole module
+@pytest.fixture(scope="module")
 def app():
     """Create a FastAPI test application with just the health router."""
-    from fastapi import APIRouter
-    from sqlalchemy import text
-
-     # … earlier lines of the fixture …
-
--    from fastapi import APIRouter
--    from sqlalchemy import text
--
--    # Create the health router inline for testing
--    router = APIRouter()
--
--    @router.get("/health")
--    def health():
--        result = {
--            "status": "ok",
--            "checks": {
--                "database": {"ok": False, "detail": None},
--                "internet": {"ok": False, "detail": None},
--                "memory": {"ok": False, "detail": None},
--            },
--        }
--
--        # Database connectivity
--        try:
--            with engine.connect() as conn:
--                conn.execute(text("SELECT 1"))
--            result["checks"]["database"] = {"ok": True, "detail": "connected"}
--        except Exception as e:  # noqa: BLE001
--            result["status"] = "degraded"
--            result["checks"]["database"] = {"ok": False, "detail": str(e)}
--
--        # Internet reachability
--        try:
--            import requests  # lazy import
--
--            r = requests.get("https://www.google.com/generate_204", timeout=3)
--            ok = r.status_code in (204, 200)
--            result["checks"]["internet"] = {"ok": ok, "detail": f"status={r.status_code}"}
--            if not ok:
--                result["status"] = "degraded"
--        except Exception as e:  # noqa: BLE001
--            result["status"] = "degraded"
--            result["checks"]["internet"] = {"ok": False, "detail": str(e)}
--
--        # Memory availability
--        try:
--            import psutil  # lazy import
--
--            vm = psutil.virtual_memory()
--            detail = {
--                "total_mb": round(vm.total / (1024 * 1024), 1),
--                "available_mb": round(vm.available / (1024 * 1024), 1),
--                "percent": vm.percent,
--            }
--            ok = vm.available > 100 * 1024 * 1024  # >100MB free
--            result["checks"]["memory"] = {"ok": ok, "detail": detail}
--            if not ok:
--                result["status"] = "degraded"
--        except Exception as e:  # noqa: BLE001
--            result["status"] = "degraded"
--            result["checks"]["memory"] = {"ok": False, "detail": str(e)}
--
--        return result
--
--    app = FastAPI()
-    from backend.app.routers.health import router
-
     app = FastAPI()
-    app.include_router(router)
-     return app
+    app.include_router(health.router)
+    return app
+
 
-     # … later lines of the fixture …
+@pytest.fixture(autouse=True)
+def _fresh_health_report(monkeypatch):
+    # The router caches its report; every test needs the checks to actually run
+    monkeypatch.setattr(health, "_cached_report", None)
+    monkeypatch.setattr(health, "_probe_addrs", None)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(app):
-    """Create a test client for the FastAPI application."""
-    return TestClient(app)
+    """Create a test client for the FastAPI application, kept open for the whole module."""
+    # Entering the client starts its event loop and lifespan once, not on every request
+    with TestClient(app) as client:
+        yield client
+
+
+_CHECK_NAMES = ("database", "internet", "memory")
+_STATUSES = frozenset({"ok", "degraded"})
+# Parsed JSON only yields these exact types, so type() checks are enough
+_ALLOWED_DETAIL = (type(None), str, dict)
+
+# What the patched DNS lookup returns for the internet probe's host
+_PROBE_ADDRINFO = [
+    (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 443)),
+    (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.2", 443)),
+]
+_DNS_PATCHER = patch('socket.getaddrinfo', return_value=_PROBE_ADDRINFO)
+
+# Built once and re-entered by every all_ok_mocks() call; each entry makes fresh mocks
+_PROBE_PATCHERS = (
+    patch('sqlalchemy.ext.asyncio.AsyncEngine.connect'),
+    patch('socket.create_connection'),
+    patch.object(health, '_virtual_memory'),
+)
+
+
+def _vm(total, available, percent):
+    """Stand-in for psutil.virtual_memory()'s result; only these three fields are read."""
+    return SimpleNamespace(total=total, available=available, percent=percent)
+
+
+def _run(coro):
+    """Run one probe coroutine directly, without going through the app."""
+    return asyncio.run(coro)
+
+
+@contextmanager
+def all_ok_mocks():
+    """Patch every probe to pass; yields (mock_db, mock_tcp, mock_memory) for per-test overrides."""
+    with ExitStack() as stack:
+        stack.enter_context(_DNS_PATCHER)
+        mock_db, mock_tcp, mock_memory = (stack.enter_context(p) for p in _PROBE_PATCHERS)
+
+        mock_db.return_value.__aenter__.return_value = AsyncMock()
+        mock_memory.return_value = _vm(8 * 1024 ** 3, 4 * 1024 ** 3, 50.0)  # 8GB, 4GB free
+        yield mock_db, mock_tcp, mock_memory
 
 
 class TestHealthEndpoint:
@@ -117,309 +98,151 @@ class TestHealthEndpoint:
         # Check top-level structure
         assert "status" in data
         assert "checks" in data
-        assert isinstance(data["checks"], dict)
+        assert type(data["checks"]) is dict
 
         # Check required checks exist
-        required_checks = ["database", "internet", "memory"]
-        for check in required_checks:
+        for check in _CHECK_NAMES:
             assert check in data["checks"]
             assert "ok" in data["checks"][check]
             assert "detail" in data["checks"][check]
-            assert isinstance(data["checks"][check]["ok"], bool)
+            assert type(data["checks"][check]["ok"]) is bool
 
-    @patch('sqlalchemy.engine.Engine.connect')
-    def test_database_check_success(self, mock_connect, client):
+    def test_database_check_success(self):
         """Test database check when connection succeeds."""
-        # Mock successful database connection
-        mock_conn = MagicMock()
-        mock_connect.return_value.__enter__.return_value = mock_conn
-
-        with patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
+        with patch('sqlalchemy.ext.asyncio.AsyncEngine.connect') as mock_db:
+            mock_conn = AsyncMock()
+            mock_db.return_value.__aenter__.return_value = mock_conn
 
-            # Mock other checks to isolate database test
-            mock_requests.return_value.status_code = 204
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024  # 8GB
-            mock_vm.available = 4 * 1024 * 1024 * 1024  # 4GB
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
+            assert _run(health._check_database()) == {"ok": True, "detail": "connected"}
+            mock_conn.execute.assert_called_once_with(health._PING_SQL)
 
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["checks"]["database"]["ok"] is True
-            assert data["checks"]["database"]["detail"] == "connected"
-            mock_conn.execute.assert_called_once()
-
-    @patch('sqlalchemy.engine.Engine.connect')
-    def test_database_check_failure(self, mock_connect, client):
+    def test_database_check_failure(self):
         """Test database check when connection fails."""
-        # Mock database connection failure
-        mock_connect.side_effect = SQLAlchemyError("Connection failed")
-
-        with patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass
-            mock_requests.return_value.status_code = 204
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["status"] == "degraded"
-            assert data["checks"]["database"]["ok"] is False
-            assert "Connection failed" in data["checks"]["database"]["detail"]
-
-    @patch('requests.get')
-    def test_internet_check_success_204(self, mock_get, client):
-        """Test internet check with successful 204 response."""
-        mock_response = MagicMock()
-        mock_response.status_code = 204
-        mock_get.return_value = mock_response
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
+        with patch('sqlalchemy.ext.asyncio.AsyncEngine.connect', side_effect=SQLAlchemyError("Connection failed")):
+            assert _run(health._check_database()) == {"ok": False, "detail": "Connection failed"}
 
-            assert data["checks"]["internet"]["ok"] is True
-            assert data["checks"]["internet"]["detail"] == "status=204"
-            mock_get.assert_called_once_with("https://www.google.com/generate_204", timeout=3)
-
-    @patch('requests.get')
-    def test_internet_check_success_200(self, mock_get, client):
-        """Test internet check with successful 200 response."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_get.return_value = mock_response
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["checks"]["internet"]["ok"] is True
-            assert data["checks"]["internet"]["detail"] == "status=200"
-
-    @patch('requests.get')
-    def test_internet_check_failure_bad_status(self, mock_get, client):
-        """Test internet check with non-success status code."""
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_get.return_value = mock_response
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["status"] == "degraded"
-            assert data["checks"]["internet"]["ok"] is False
-            assert data["checks"]["internet"]["detail"] == "status=500"
-
-    @patch('requests.get')
-    def test_internet_check_timeout_exception(self, mock_get, client):
-        """Test internet check with timeout exception."""
-        mock_get.side_effect = Timeout("Request timed out")
+    def test_database_check_uses_dedicated_pool(self):
+        """Test that the database probe has its own single-connection engine."""
+        from app.core import db
 
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
+        assert health.health_engine is db.health_engine
+        assert db.health_engine is not db.engine
+        assert db.health_engine.pool.size() == 1
 
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
+    def test_database_check_stall_is_cut_off(self, client):
+        """Test that a hung database probe is reported as timed out within the refresh bound."""
+        async def stall(*args):
+            await asyncio.sleep(5)
 
-            response = client.get("/health")
-            data = response.json()
+        with all_ok_mocks() as (mock_db, mock_tcp, mock_memory):
+            mock_db.return_value.__aenter__.side_effect = stall
 
-            assert data["status"] == "degraded"
-            assert data["checks"]["internet"]["ok"] is False
-            assert "Request timed out" in data["checks"]["internet"]["detail"]
-
-    @patch('requests.get')
-    def test_internet_check_connection_exception(self, mock_get, client):
-        """Test internet check with connection exception."""
-        mock_get.side_effect = RequestException("Connection error")
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
+            start = time.perf_counter()
+            data = client.get("/health").json()
+            elapsed = time.perf_counter() - start
 
+            assert elapsed < health.HEALTH_PROBE_TIMEOUT_SECONDS + 0.5
             assert data["status"] == "degraded"
-            assert data["checks"]["internet"]["ok"] is False
-            assert "Connection error" in data["checks"]["internet"]["detail"]
-
-    @patch('psutil.virtual_memory')
-    def test_memory_check_success_high_memory(self, mock_psutil, client):
-        """Test memory check with sufficient available memory."""
-        mock_vm = MagicMock()
-        mock_vm.total = 8 * 1024 * 1024 * 1024  # 8GB
-        mock_vm.available = 4 * 1024 * 1024 * 1024  # 4GB available
-        mock_vm.percent = 50.0
-        mock_psutil.return_value = mock_vm
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-
-            response = client.get("/health")
-            data = response.json()
-
+            assert data["checks"]["database"] == {"ok": False, "detail": "probe timeout"}
+            # The other probes still report their own results
+            assert data["checks"]["internet"]["ok"] is True
             assert data["checks"]["memory"]["ok"] is True
-            expected_detail = {
-                "total_mb": 8192.0,
-                "available_mb": 4096.0,
-                "percent": 50.0
-            }
-            assert data["checks"]["memory"]["detail"] == expected_detail
-
-    @patch('psutil.virtual_memory')
-    def test_memory_check_failure_low_memory(self, mock_psutil, client):
-        """Test memory check with insufficient available memory."""
-        mock_vm = MagicMock()
-        mock_vm.total = 1 * 1024 * 1024 * 1024  # 1GB
-        mock_vm.available = 50 * 1024 * 1024  # 50MB available (less than 100MB threshold)
-        mock_vm.percent = 95.0
-        mock_psutil.return_value = mock_vm
 
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["status"] == "degraded"
-            assert data["checks"]["memory"]["ok"] is False
-            expected_detail = {
-                "total_mb": 1024.0,
-                "available_mb": 50.0,
-                "percent": 95.0
+    def test_internet_check_success(self):
+        """Test internet check when the TCP connect succeeds."""
+        with _DNS_PATCHER, patch('socket.create_connection') as mock_tcp:
+            assert _run(health._check_internet()) == {"ok": True, "detail": "tcp_ok"}
+
+        mock_tcp.assert_called_once_with(("192.0.2.1", 443), timeout=0.5)
+        # The probe socket is closed straight away
+        mock_tcp.return_value.__exit__.assert_called_once()
+
+    @pytest.mark.parametrize("exc, detail", [
+        (ConnectionRefusedError("Connection refused"), "Connection refused"),
+        (socket.timeout("timed out"), "timed out"),
+        (OSError("Connection error"), "Connection error"),
+    ], ids=["refused", "timeout", "os-error"])
+    def test_internet_check_failure(self, exc, detail):
+        """Test internet check when the TCP connect raises."""
+        with _DNS_PATCHER, patch('socket.create_connection', side_effect=exc):
+            assert _run(health._check_internet()) == {"ok": False, "detail": detail}
+
+    def test_internet_probe_reuses_resolved_address(self):
+        """Test that the probe host is resolved once and its address reused."""
+        with _DNS_PATCHER as mock_dns, patch('socket.create_connection') as mock_tcp:
+            health._tcp_connect()
+            health._tcp_connect()
+
+        mock_dns.assert_called_once_with("www.google.com", 443, type=socket.SOCK_STREAM)
+        assert mock_tcp.call_args_list == [call(("192.0.2.1", 443), timeout=0.5)] * 2
+
+    def test_internet_probe_rotates_after_failed_connect(self):
+        """Test that an address that fails to connect is tried last next time."""
+        with _DNS_PATCHER, \
+             patch('socket.create_connection', side_effect=[OSError("unreachable"), DEFAULT]) as mock_tcp:
+            with pytest.raises(OSError):
+                health._tcp_connect()
+            health._tcp_connect()
+
+        assert mock_tcp.call_args_list[1] == call(("192.0.2.2", 443), timeout=0.5)
+
+    def test_internet_check_slow_connect_fails_fast(self):
+        """Test that a stalled connect is reported after the probe timeout, not when it returns."""
+        # TestClient joins worker threads on shutdown, so drive the probe on a bare loop
+        loop = asyncio.new_event_loop()
+        try:
+            with _DNS_PATCHER, \
+                 patch('socket.create_connection', side_effect=lambda *args, **kwargs: time.sleep(1.5)):
+                start = time.perf_counter()
+                result = loop.run_until_complete(health._check_internet())
+                elapsed = time.perf_counter() - start
+        finally:
+            loop.close()
+
+        assert elapsed < 1.0
+        assert result == {"ok": False, "detail": "timed out"}
+
+    @pytest.mark.parametrize("reading, ok, total_mb, available_mb", [
+        (_vm(8 * 1024 ** 3, 4 * 1024 ** 3, 50.0), True, 8192.0, 4096.0),
+        (_vm(1024 ** 3, 50 * 1024 ** 2, 95.0), False, 1024.0, 50.0),  # below the 100MB threshold
+        # Should fail because condition is > 100MB, not >= 100MB
+        (_vm(2 * 1024 ** 3, 100 * 1024 ** 2, 95.0), False, 2048.0, 100.0),
+        (_vm(0, 0, 0.0), False, 0.0, 0.0),  # zero total must not divide by zero
+        (_vm(1024 ** 4, 512 * 1024 ** 3, 50.0), True, 1048576.0, 524288.0),  # 1TB, 512GB
+        (_vm(3584 * 1024 ** 2, 1280 * 1024 ** 2, 64.3), True, 3584.0, 1280.0),  # 3.5GB, 1.25GB
+    ], ids=["high", "low", "boundary-100mb", "zero-total", "very-large", "fractional-gb"])
+    def test_memory_check(self, reading, ok, total_mb, available_mb):
+        """Test memory check status and its detail figures, rounded to 1 decimal place."""
+        with patch.object(health, '_virtual_memory', return_value=reading):
+            assert _run(health._check_memory()) == {
+                "ok": ok,
+                "detail": {"total_mb": total_mb, "available_mb": available_mb, "percent": reading.percent},
             }
-            assert data["checks"]["memory"]["detail"] == expected_detail
-
-    @patch('psutil.virtual_memory')
-    def test_memory_check_boundary_exactly_100mb(self, mock_psutil, client):
-        """Test memory check at the exact 100MB boundary."""
-        mock_vm = MagicMock()
-        mock_vm.total = 2 * 1024 * 1024 * 1024  # 2GB
-        mock_vm.available = 100 * 1024 * 1024  # Exactly 100MB available
-        mock_vm.percent = 95.0
-        mock_psutil.return_value = mock_vm
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests:
 
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
+    def test_memory_check_exception(self):
+        """Test memory check when reading memory stats raises an exception."""
+        with patch.object(health, '_virtual_memory', side_effect=Exception("Memory access error")):
+            assert _run(health._check_memory()) == {"ok": False, "detail": "Memory access error"}
 
-            response = client.get("/health")
-            data = response.json()
+    def test_parse_meminfo(self):
+        """Test that /proc/meminfo totals are read in bytes with psutil's percent."""
+        data = (
+            b"MemTotal:        8388608 kB\n"
+            b"MemFree:         1048576 kB\n"
+            b"MemAvailable:    4194304 kB\n"
+            b"Buffers:          204800 kB\n"
+        )
 
-            # Should fail because condition is > 100MB, not >= 100MB
-            assert data["status"] == "degraded"
-            assert data["checks"]["memory"]["ok"] is False
+        assert health._parse_meminfo(data) == (8 * 1024 ** 3, 4 * 1024 ** 3, 50.0)
 
-    @patch('psutil.virtual_memory')
-    def test_memory_check_exception(self, mock_psutil, client):
-        """Test memory check when psutil raises an exception."""
-        mock_psutil.side_effect = Exception("Memory access error")
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-
-            response = client.get("/health")
-            data = response.json()
-
-            assert data["status"] == "degraded"
-            assert data["checks"]["memory"]["ok"] is False
-            assert "Memory access error" in data["checks"]["memory"]["detail"]
+    @pytest.mark.skipif(not health._HAVE_PROC_MEMINFO, reason="needs /proc/meminfo")
+    def test_virtual_memory_matches_psutil_total(self):
+        """Test that the /proc/meminfo reader agrees with psutil on total memory."""
+        assert health._virtual_memory().total == psutil.virtual_memory().total
 
     def test_all_checks_pass_status_ok(self, client):
         """Test that when all checks pass, overall status is 'ok'."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock all checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-
-            mock_requests.return_value.status_code = 204
-
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
+        with all_ok_mocks():
             response = client.get("/health")
             data = response.json()
 
@@ -430,22 +253,15 @@ class TestHealthEndpoint:
 
     def test_multiple_checks_fail_status_degraded(self, client):
         """Test that when multiple checks fail, overall status is 'degraded'."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
+        with all_ok_mocks() as (mock_db, mock_tcp, mock_memory):
             # Mock database to fail
             mock_db.side_effect = SQLAlchemyError("DB error")
 
             # Mock internet to fail
-            mock_requests.side_effect = RequestException("Network error")
+            mock_tcp.side_effect = OSError("Network error")
 
             # Mock memory to be low
-            mock_vm = MagicMock()
-            mock_vm.total = 1 * 1024 * 1024 * 1024
-            mock_vm.available = 50 * 1024 * 1024  # Low memory
-            mock_vm.percent = 95.0
-            mock_psutil.return_value = mock_vm
+            mock_memory.return_value = _vm(1024 ** 3, 50 * 1024 ** 2, 95.0)  # Low memory
 
             response = client.get("/health")
             data = response.json()
@@ -455,85 +271,23 @@ class TestHealthEndpoint:
             assert data["checks"]["internet"]["ok"] is False
             assert data["checks"]["memory"]["ok"] is False
 
-    def test_memory_detail_calculation_precision(self, client):
-        """Test that memory calculations are properly rounded to 1 decimal place."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-
-            # Mock memory with values that need rounding
-            mock_vm = MagicMock()
-            mock_vm.total = 3 * 1024 * 1024 * 1024 + 512 * 1024 * 1024  # 3.5GB
-            mock_vm.available = 1 * 1024 * 1024 * 1024 + 256 * 1024 * 1024  # 1.25GB
-            mock_vm.percent = 64.3
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
-
-            memory_detail = data["checks"]["memory"]["detail"]
-            assert memory_detail["total_mb"] == 3584.0  # Should be rounded to 1 decimal
-            assert memory_detail["available_mb"] == 1280.0  # Should be rounded to 1 decimal
-            assert memory_detail["percent"] == 64.3
-
-    def test_lazy_imports_not_imported_initially(self, client):
-        """Test that requests and psutil are imported lazily within the function."""
-        # This test verifies the lazy import pattern, though it's difficult to test directly
-        # We can at least verify the endpoint works without pre-importing
-        response = client.get("/health")
-        assert response.status_code == 200
-
-    @patch('builtins.__import__')
-    def test_requests_import_failure(self, mock_import, client):
-        """Test behavior when requests module cannot be imported."""
-        def side_effect(name, *args, **kwargs):
-            if name == 'requests':
-                raise ModuleNotFoundError("No module named 'requests'")  # noqa
-            return __import__(name, *args, **kwargs)
-
-        mock_import.side_effect = side_effect
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
+    def test_virtual_memory_falls_back_to_psutil(self):
+        """Test that psutil supplies the memory figures where /proc/meminfo is unavailable."""
+        reading = _vm(2 * 1024 ** 3, 1024 ** 3, 50.0)
 
-            assert data["status"] == "degraded"
-            assert data["checks"]["internet"]["ok"] is False
-            assert "No module named 'requests'" in data["checks"]["internet"]["detail"]
+        with patch.object(health, '_HAVE_PROC_MEMINFO', False), \
+             patch.object(health, '_psutil', SimpleNamespace(virtual_memory=lambda: reading)):
+            assert health._virtual_memory() is reading
 
-    @patch('builtins.__import__')
-    def test_psutil_import_failure(self, mock_import, client):
-        """Test behavior when psutil module cannot be imported."""
-        def side_effect(name, *args, **kwargs):
-            if name == 'psutil':
-                raise ModuleNotFoundError("No module named 'psutil'")  # noqa
-            return __import__(name, *args, **kwargs)
-
-        mock_import.side_effect = side_effect
-
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests:
+    def test_psutil_import_failure(self, client):
+        """Test behavior when psutil is needed but not installed."""
+        with patch.object(health, '_HAVE_PROC_MEMINFO', False), \
+             patch.object(health, '_psutil', None), \
+             patch('sqlalchemy.ext.asyncio.AsyncEngine.connect') as mock_db, \
+             patch('socket.create_connection'):
 
             # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
+            mock_db.return_value.__aenter__.return_value = AsyncMock()
 
             response = client.get("/health")
             data = response.json()
@@ -559,30 +313,16 @@ class TestHealthEndpoint:
         response = client.get("/health")
         data = response.json()
 
-        assert data["status"] in ["ok", "degraded"]
+        assert data["status"] in _STATUSES
 
         for _check_name, check_data in data["checks"].items():
-            assert isinstance(check_data["ok"], bool)
+            assert type(check_data["ok"]) is bool
             # detail can be None, string, or dict (for memory)
-            assert check_data["detail"] is None or \
-                   isinstance(check_data["detail"], (str, dict))
+            assert type(check_data["detail"]) in _ALLOWED_DETAIL
 
     def test_endpoint_is_idempotent(self, client):
         """Test that multiple calls to the health endpoint return consistent results."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Set up consistent mocks
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-            mock_vm = MagicMock()
-            mock_vm.total = 8 * 1024 * 1024 * 1024
-            mock_vm.available = 4 * 1024 * 1024 * 1024
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
+        with all_ok_mocks() as (mock_db, mock_tcp, mock_memory):
             # Make multiple requests
             response1 = client.get("/health")
             response2 = client.get("/health")
@@ -590,57 +330,55 @@ class TestHealthEndpoint:
             data1 = response1.json()
             data2 = response2.json()
 
-            # Results should be identical
+            # The second call is served from the cached report, bytes included
             assert data1 == data2
+            assert response1.content == response2.content
             assert response1.status_code == response2.status_code
+            mock_tcp.assert_called_once()
+            mock_memory.assert_called_once()
 
-    def test_edge_case_zero_total_memory(self, client):
-        """Test memory check with edge case of zero total memory."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
+    def test_cached_report_expires_after_ttl(self, client, monkeypatch):
+        """Test that the checks run again once the cached report is older than the TTL."""
+        clock = [1000.0]
+        monkeypatch.setattr(health, "time", SimpleNamespace(monotonic=lambda: clock[0]))
 
-            # Mock other checks to pass
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
+        with all_ok_mocks() as (mock_db, mock_tcp, mock_memory):
+            assert client.get("/health").json()["status"] == "ok"
 
-            # Edge case: zero total memory
-            mock_vm = MagicMock()
-            mock_vm.total = 0
-            mock_vm.available = 0
-            mock_vm.percent = 0.0
-            mock_psutil.return_value = mock_vm
+            # Still fresh just before the TTL runs out
+            clock[0] += health.HEALTH_CACHE_TTL_SECONDS - 0.1
+            mock_tcp.side_effect = OSError("Network is unreachable")
+            assert client.get("/health").json()["status"] == "ok"
 
-            response = client.get("/health")
-            data = response.json()
-
-            # Should handle division gracefully
-            assert data["checks"]["memory"]["ok"] is False  # 0 < 100MB
-            assert data["checks"]["memory"]["detail"]["total_mb"] == 0.0
-            assert data["checks"]["memory"]["detail"]["available_mb"] == 0.0
-
-    def test_very_large_memory_values(self, client):
-        """Test memory check with very large memory values."""
-        with patch('sqlalchemy.engine.Engine.connect') as mock_db, \
-             patch('requests.get') as mock_requests, \
-             patch('psutil.virtual_memory') as mock_psutil:
-
-            # Mock other checks to pass  
-            mock_conn = MagicMock()
-            mock_db.return_value.__enter__.return_value = mock_conn
-            mock_requests.return_value.status_code = 204
-
-            # Very large memory values (e.g., 1TB)
-            mock_vm = MagicMock()
-            mock_vm.total = 1024 * 1024 * 1024 * 1024  # 1TB
-            mock_vm.available = 512 * 1024 * 1024 * 1024  # 512GB
-            mock_vm.percent = 50.0
-            mock_psutil.return_value = mock_vm
-
-            response = client.get("/health")
-            data = response.json()
+            clock[0] += 0.1
+            data = client.get("/health").json()
 
-            assert data["checks"]["memory"]["ok"] is True
-            assert data["checks"]["memory"]["detail"]["total_mb"] == 1048576.0  # 1TB in MB
-            assert data["checks"]["memory"]["detail"]["available_mb"] == 524288.0  # 512GB in MB
\ No newline at end of file
+            assert data["status"] == "degraded"
+            assert data["checks"]["internet"]["detail"] == "Network is unreachable"
+            assert mock_tcp.call_count == 2
+
+    def test_head_reports_status_code_only(self, client):
+        """Test that HEAD answers 200 with no body while all checks pass."""
+        with all_ok_mocks():
+            response = client.head("/health")
+
+            assert response.status_code == 200
+            assert response.content == b""
+            assert response.headers["etag"] == client.get("/health").headers["etag"]
+
+    def test_head_degraded_is_503(self, client):
+        """Test that HEAD answers 503 when any check fails."""
+        with all_ok_mocks() as (mock_db, mock_tcp, mock_memory):
+            mock_tcp.side_effect = OSError("Network error")
+
+            assert client.head("/health").status_code == 503
+
+    def test_matching_etag_gets_304(self, client):
+        """Test that a GET carrying the current ETag gets an empty 304."""
+        with all_ok_mocks():
+            etag = client.get("/health").headers["etag"]
+            response = client.get("/health", headers={"If-None-Match": etag})
+
+            assert response.status_code == 304
+            assert response.content == b""
+            assert client.get("/health", headers={"If-None-Match": '"stale"'}).status_code == 200